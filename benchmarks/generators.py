@@ -0,0 +1,130 @@
+"""Synthetic annotation tables for benchmarking.
+
+Tables mimic the annotation data synced between databases and sheets: integer and uint64 ids,
+low-cardinality status strings, floats, free text, list-valued tags and 3d point positions,
+with a configurable density of missing values.
+"""
+import numpy as np
+import pandas as pd
+
+CELL_TYPES = ["pyramidal", "basket", "chandelier", "martinotti", "bipolar", "unknown"]
+STATUSES = ["todo", "in progress", "done", "flagged"]
+
+
+def _with_missing(values, rng, na_fraction):
+    values = np.asarray(values, dtype=object)
+    values[rng.random(len(values)) < na_fraction] = None
+    return values
+
+
+def _points(rng, n):
+    coords = rng.integers(0, 200_000, size=(n, 3))
+    out = np.empty(n, dtype=object)
+    out[:] = coords.tolist()
+    return out
+
+
+def make_annotation_table(n_rows, na_fraction=0.05, seed=0):
+    """Annotation table with mixed dtypes.
+
+    Parameters
+    ----------
+    n_rows : int
+        Number of rows
+    na_fraction : float, optional
+        Fraction of missing values in the nullable columns, by default 0.05
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    tags = np.empty(n_rows, dtype=object)
+    tags[:] = [
+        list(rng.choice(CELL_TYPES, size=k, replace=False))
+        for k in rng.integers(0, 3, size=n_rows)
+    ]
+    return pd.DataFrame(
+        {
+            "id": np.arange(n_rows, dtype=np.int64),
+            "root_id": rng.integers(
+                864691135000000000, 864691140000000000, size=n_rows, dtype=np.uint64
+            ),
+            "cell_type": _with_missing(rng.choice(CELL_TYPES, n_rows), rng, na_fraction),
+            "status": _with_missing(rng.choice(STATUSES, n_rows), rng, na_fraction),
+            "count": rng.integers(0, 1000, size=n_rows),
+            "score": np.where(
+                rng.random(n_rows) < na_fraction, np.nan, rng.random(n_rows)
+            ),
+            "note": _with_missing(
+                np.char.add("note ", rng.integers(0, 10**6, n_rows).astype(str)),
+                rng,
+                na_fraction,
+            ),
+            "tags": tags,
+            "pt_position": _with_missing(_points(rng, n_rows), rng, na_fraction),
+        }
+    )
+
+
+def make_changed_copy(df, change_rate=0.01, new_rate=0.01, removed_rate=0.01, seed=1):
+    """Copy of an annotation table with some rows edited, added and removed.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table from `make_annotation_table`
+    change_rate : float, optional
+        Fraction of rows with one edited column, by default 0.01
+    new_rate : float, optional
+        Number of added rows as a fraction of the table, by default 0.01
+    removed_rate : float, optional
+        Fraction of rows removed, by default 0.01
+    seed : int, optional
+        Random seed, by default 1
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    n = len(df)
+    out = df.copy()
+
+    changed = np.flatnonzero(rng.random(n) < change_rate)
+    columns = rng.choice(["cell_type", "status", "count", "score", "pt_position"], len(changed))
+    for column in np.unique(columns):
+        rows = changed[columns == column]
+        if column in ("cell_type", "status"):
+            values = np.full(len(rows), "edited", dtype=object)
+        elif column == "pt_position":
+            values = _points(rng, len(rows))
+        else:
+            values = out[column].to_numpy()[rows] + 1
+        out.loc[out.index[rows], column] = pd.Series(values, index=out.index[rows])
+
+    out = out[rng.random(n) >= removed_rate]
+    n_new = int(round(n * new_rate))
+    if n_new > 0:
+        new = make_annotation_table(n_new, seed=seed + 1)
+        new["id"] = np.arange(n, n + n_new)
+        out = pd.concat([out, new], ignore_index=True)
+    return out.reset_index(drop=True)
+
+
+def _cell_text(x):
+    if isinstance(x, list):
+        return ", ".join(str(v) for v in x)
+    if x is None or x is pd.NA or (isinstance(x, float) and np.isnan(x)):
+        return ""
+    return str(x)
+
+
+def make_sheet_values(df):
+    """Rows of strings as returned by a sheets values get request for the table.
+
+    Formatted here rather than with tablebridge, so every version is timed on the same input.
+    """
+    return [[_cell_text(x) for x in row] for row in df.itertuples(index=False)]
@@ -0,0 +1,237 @@
+"""CPU and memory benchmarks for the tablebridge hot paths.
+
+Each stage is run once to warm up caches, once under tracemalloc to record peak memory, then
+timed with time.perf_counter over several repeats. Results are written as JSON, along with
+the git commit of the tablebridge tree, so runs from different commits can be compared.
+
+Stages only call functions that tablebridge has had since its first release, so the same
+script can time an earlier release from another source tree, e.g. a git worktree:
+
+    python benchmarks/run_benchmarks.py --sizes 1000 10000 100000 --output new.json
+    git worktree add ../tablebridge-old <commit or tag>
+    python benchmarks/run_benchmarks.py --source ../tablebridge-old --output old.json
+    python benchmarks/run_benchmarks.py --sizes 1000 10000 100000 --compare old.json
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from generators import make_annotation_table, make_changed_copy, make_sheet_values
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+# Source tree this script belongs to
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_tablebridge(source=REPO_ROOT):
+    "Import tablebridge from a source tree, ahead of any installed copy"
+    sys.path.insert(0, os.path.abspath(source))
+    for module in ("processing", "utils", "validation"):
+        importlib.import_module(f"tablebridge.{module}")
+    return sys.modules["tablebridge"]
+
+
+def _stage_process_records(tb, df, old_df, change_rate):
+    validation_map = {
+        "id": tb.validation.process_int,
+        "root_id": tb.validation.process_uint64,
+        "count": tb.validation.process_int,
+        "pt_position": tb.validation.process_point,
+    }
+    values = make_sheet_values(df)
+    columns = list(df.columns)
+    return lambda: tb.processing.process_records(values, columns, validation_map)
+
+
+def _stage_process_column(tb, df, old_df, change_rate):
+    return lambda: [tb.validation.process_column(df[c]) for c in df.columns]
+
+
+def _stage_annotation_comparison(tb, df, old_df, change_rate):
+    def run():
+        comp = tb.AnnotationComparison(df, old_df, "id")
+        return (
+            comp.new_annotations(),
+            comp.removed_annotations(),
+            comp.changed_annotations(),
+        )
+
+    return run
+
+
+def _stage_package_batch_update(tb, df, old_df, change_rate):
+    rng = np.random.default_rng(2)
+    n_cells = max(1, int(len(df) * max(change_rate, 0.01)))
+    rows = rng.integers(2, len(df) + 2, size=n_cells)
+    columns = rng.choice(["C", "D", "E", "F", "I"], size=n_cells)
+    values = rng.integers(0, 1000, size=n_cells).astype(str).astype(object)
+    return lambda: tb.processing._package_batch_update(rows, columns, values, "Sheet1")
+
+
+def _stage_fill_column_from_above(tb, df, old_df, change_rate):
+    # Early releases fill the frame passed in, so each run gets its own copy
+    return lambda: tb.fill_column_from_above(df.copy(), ["cell_type", "note"])
+
+
+def _stage_number_to_column(tb, df, old_df, change_rate):
+    numbers = np.arange(len(df)) % 18278
+    return lambda: [tb.utils.number_to_column(n) for n in numbers]
+
+
+STAGES = {
+    "process_records": _stage_process_records,
+    "process_column": _stage_process_column,
+    "annotation_comparison": _stage_annotation_comparison,
+    "package_batch_update": _stage_package_batch_update,
+    "fill_column_from_above": _stage_fill_column_from_above,
+    "number_to_column": _stage_number_to_column,
+}
+
+
+def measure(func, repeat):
+    "Peak traced memory of one run after a warm-up run, then wall times of repeated runs"
+    # Lookup tables and other caches built on first use would otherwise count as peak memory
+    func()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    seconds = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - t0)
+    return seconds, peak
+
+
+def _git(tb, *args):
+    try:
+        out = subprocess.run(
+            ["git", *args],
+            cwd=os.path.dirname(os.path.abspath(tb.__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def git_commit(tb):
+    "Commit of the tablebridge source tree, with a -dirty suffix for local changes, or None"
+    commit = _git(tb, "rev-parse", "HEAD")
+    if commit is None:
+        return None
+    if _git(tb, "status", "--porcelain", "--untracked-files=no"):
+        commit += "-dirty"
+    return commit
+
+
+def environment(tb):
+    return {
+        "tablebridge": tb.__version__,
+        "source": os.path.dirname(os.path.dirname(os.path.abspath(tb.__file__))),
+        "git_commit": git_commit(tb),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def run(tb, sizes, stages, repeat, change_rate, na_fraction):
+    results = []
+    for n_rows in sizes:
+        old_df = make_annotation_table(n_rows, na_fraction=na_fraction)
+        df = make_changed_copy(
+            old_df, change_rate=change_rate, new_rate=change_rate, removed_rate=change_rate
+        )
+        for name in stages:
+            seconds, peak = measure(STAGES[name](tb, df, old_df, change_rate), repeat)
+            result = {
+                "stage": name,
+                "n_rows": n_rows,
+                "seconds": seconds,
+                "min_seconds": min(seconds),
+                "median_seconds": statistics.median(seconds),
+                "peak_bytes": peak,
+                "rows_per_second": n_rows / min(seconds) if min(seconds) > 0 else None,
+            }
+            results.append(result)
+            print(
+                f"{name:>24} {n_rows:>9} rows  {result['min_seconds']:9.4f} s  "
+                f"{peak / 2**20:9.1f} MiB peak",
+                file=sys.stderr,
+            )
+    return results
+
+
+def compare(results, baseline):
+    "Print the ratio of new to baseline median time and peak memory for each stage and size"
+    base = {(r["stage"], r["n_rows"]): r for r in baseline["results"]}
+    print(f"baseline commit: {baseline['environment'].get('git_commit')}")
+    print(f"{'stage':>24} {'rows':>9} {'time':>8} {'memory':>8}")
+    for r in results:
+        b = base.get((r["stage"], r["n_rows"]))
+        if b is None:
+            continue
+        time_ratio = r["median_seconds"] / b["median_seconds"]
+        mem_ratio = r["peak_bytes"] / b["peak_bytes"] if b["peak_bytes"] else float("nan")
+        print(f"{r['stage']:>24} {r['n_rows']:>9} {time_ratio:7.2f}x {mem_ratio:7.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--change-rate", type=float, default=0.01)
+    parser.add_argument("--na-fraction", type=float, default=0.05)
+    parser.add_argument("--output", help="JSON file to write results to")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument(
+        "--source",
+        default=REPO_ROOT,
+        help="tablebridge source tree to benchmark, by default the one containing this script",
+    )
+    args = parser.parse_args(argv)
+
+    tb = load_tablebridge(args.source)
+    report = {
+        "environment": environment(tb),
+        "settings": {
+            "repeat": args.repeat,
+            "change_rate": args.change_rate,
+            "na_fraction": args.na_fraction,
+        },
+        "results": run(
+            tb, args.sizes, args.stages, args.repeat, args.change_rate, args.na_fraction
+        ),
+    }
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.compare is not None:
+        with open(args.compare) as f:
+            compare(report["results"], json.load(f))
+
+
+if __name__ == "__main__":
+    main()
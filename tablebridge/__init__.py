@@ -1,5 +1,14 @@
 from .comparison import *
 from .processing import *
+from .fingerprint import *
+from .points import *
+from .executor import *
+from .cache import *
+from .aio import *
+from .sync import *
+from .instrumentation import *
+from .addressing import *
 from . import validation
+from . import comparators
 
 __version__ = "0.1.0"
\ No newline at end of file
@@ -0,0 +1,135 @@
+import string
+import functools
+import numpy as np
+
+__all__ = ["column_letters", "column_numbers", "a1_ranges", "grid_ranges"]
+
+# Sheets allows at most 18,278 columns, i.e. up to ZZZ
+MAX_COLUMNS = 26 + 26**2 + 26**3
+
+
+@functools.lru_cache(maxsize=None)
+def _letter_table():
+    "Column letters of every 0-based column number, A to ZZZ"
+    one = np.array(list(string.ascii_uppercase))
+    two = np.char.add(np.repeat(one, 26), np.tile(one, 26))
+    three = np.char.add(np.repeat(one, 26**2), np.tile(two, 26))
+    table = np.concatenate([one, two, three])
+    table.flags.writeable = False
+    return table
+
+
+@functools.lru_cache(maxsize=None)
+def _number_lookup():
+    return {letters: ii for ii, letters in enumerate(_letter_table().tolist())}
+
+
+def column_letters(numbers):
+    """Column letters of 0-based column numbers, in bijective base 26 (0 is A, 25 is Z, 26 is AA).
+
+    Parameters
+    ----------
+    numbers : int or array-like
+        0-based column numbers, less than 18,278
+
+    Returns
+    -------
+    str or np.ndarray
+        Letters, as a string for a scalar input and a string array otherwise.
+    """
+    numbers = np.asarray(numbers)
+    if np.any(numbers < 0) or np.any(numbers >= MAX_COLUMNS):
+        raise ValueError(f"Column numbers must be between 0 and {MAX_COLUMNS - 1}")
+    letters = _letter_table()[numbers]
+    return str(letters) if letters.ndim == 0 else letters
+
+
+def column_numbers(letters):
+    """0-based column numbers of column letters, the inverse of `column_letters`.
+
+    Parameters
+    ----------
+    letters : str or array-like
+        Uppercase column letters, A to ZZZ
+
+    Returns
+    -------
+    int or np.ndarray
+        Column numbers, as an int for a scalar input and an int64 array otherwise.
+    """
+    lookup = _number_lookup()
+    if isinstance(letters, str):
+        try:
+            return lookup[letters]
+        except KeyError:
+            raise ValueError(f"Invalid column letters: {letters!r}") from None
+    letters = np.asarray(letters, dtype=str)
+    unique, inverse = np.unique(letters, return_inverse=True)
+    try:
+        numbers = np.array([lookup[x] for x in unique.tolist()], dtype=np.int64)
+    except KeyError as err:
+        raise ValueError(f"Invalid column letters: {err.args[0]!r}") from None
+    return numbers[inverse].reshape(letters.shape)
+
+
+def a1_ranges(row0, col0, row1, col1, sheet_name=None):
+    """A1 range strings for arrays of rectangles, e.g. "Sheet1!B2:D5".
+
+    Parameters
+    ----------
+    row0, row1 : array-like
+        First and last sheet row of each rectangle, inclusive
+    col0, col1 : array-like
+        First and last 0-based column number of each rectangle, inclusive
+    sheet_name : str or None, optional
+        Sheet name to prefix the ranges with, by default None
+
+    Returns
+    -------
+    np.ndarray
+        String array of ranges
+    """
+    ranges = np.char.add(
+        np.char.add(column_letters(np.atleast_1d(col0)), np.asarray(row0).astype(str)),
+        np.char.add(
+            np.char.add(":", column_letters(np.atleast_1d(col1))),
+            np.asarray(row1).astype(str),
+        ),
+    )
+    if sheet_name is not None:
+        ranges = np.char.add(f"{sheet_name}!", ranges)
+    return ranges
+
+
+def grid_ranges(row0, col0, row1, col1, sheet_id=0):
+    """GridRange dicts for arrays of rectangles, as used by spreadsheets.batchUpdate requests.
+
+    Bounds are taken in the same inclusive sheet-row and 0-based column form as `a1_ranges`
+    and converted to the 0-based, end-exclusive indices of a GridRange.
+
+    Parameters
+    ----------
+    sheet_id : int, optional
+        Numeric id of the sheet within the spreadsheet (its "gid"), by default 0
+
+    Returns
+    -------
+    list
+        List of GridRange dicts
+    """
+    bounds = np.stack(
+        np.broadcast_arrays(
+            np.asarray(row0) - 1, np.asarray(row1), np.asarray(col0), np.asarray(col1) + 1
+        ),
+        axis=-1,
+    ).reshape(-1, 4)
+    return [
+        {
+            "sheetId": sheet_id,
+            "startRowIndex": r0,
+            "endRowIndex": r1,
+            "startColumnIndex": c0,
+            "endColumnIndex": c1,
+        }
+        for r0, r1, c0, c1 in bounds.tolist()
+    ]
@@ -0,0 +1,335 @@
+import asyncio
+from urllib.parse import quote
+
+from . import instrumentation
+from .auth import default_pool
+from .executor import ExecutionReport, default_executor, _count_retry
+from .processing import (
+    _BaseSheetProcessor,
+    _package_append_data,
+    _package_batch_update,
+    _record_response,
+    _record_write,
+)
+from .validation import serialize_column, serialize_frame
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+__all__ = ["AsyncSheetsClient", "AsyncSheetProcessor"]
+
+SHEETS_API_URL = "https://sheets.googleapis.com"
+
+
+class AsyncSheetsClient:
+    """Asyncio HTTP client for the Sheets values API, built on httpx.
+
+    Connections are pooled and reused, and at most `max_concurrency` requests are in flight at once.
+    Requests take the same quota tokens and follow the same retry policy as the blocking
+    `RequestExecutor`. Share one client between processors to share connections and limits.
+
+    Parameters
+    ----------
+    base_url : str, optional
+        API root, by default "https://sheets.googleapis.com". Point it at a local stand-in for testing.
+    max_concurrency : int, optional
+        Most requests in flight at once, by default 10
+    executor : RequestExecutor, optional
+        Source of quota buckets, retry settings and request size limits. By default the shared executor.
+    timeout : float, optional
+        Request timeout in seconds, by default 60
+    transport : httpx.AsyncBaseTransport, optional
+        Custom transport, e.g. `httpx.MockTransport` for tests.
+    """
+
+    def __init__(
+        self,
+        base_url=SHEETS_API_URL,
+        max_concurrency=10,
+        executor=None,
+        timeout=60,
+        transport=None,
+    ):
+        if httpx is None:
+            raise ImportError("AsyncSheetsClient requires httpx (pip install httpx)")
+        if executor is None:
+            executor = default_executor()
+        self._executor = executor
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            transport=transport,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def executor(self):
+        return self._executor
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def request(
+        self,
+        method,
+        path,
+        kind="read",
+        params=None,
+        json=None,
+        headers=None,
+        report=None,
+        record=None,
+        idempotent=None,
+    ):
+        """Send a request, retrying on quota and server errors.
+
+        Retries follow `RequestExecutor.retry_delay`. Requests that fail without a response,
+        e.g. on a timeout, are only retried if they are idempotent, since the server may
+        already have applied them.
+
+        Parameters
+        ----------
+        idempotent : bool or None, optional
+            Whether the request can safely be sent twice. By default only GET requests are.
+
+        Returns
+        -------
+        dict or None
+            Decoded JSON response, or None if the request failed and a report was given.
+        """
+        if idempotent is None:
+            idempotent = method == "GET"
+        executor = self._executor
+        attempt = 0
+        while True:
+            for bucket in executor.buckets(kind):
+                await bucket.acquire_async()
+            try:
+                async with self._semaphore:
+                    response = await self._client.request(
+                        method, path, params=params, json=json, headers=headers
+                    )
+                response.raise_for_status()
+            except (httpx.HTTPStatusError, httpx.TransportError) as err:
+                status, retry_after = _failure_status(err)
+                delay = executor.retry_delay(attempt, status, retry_after, idempotent)
+                if delay is not None:
+                    _count_retry(kind, status, delay, report, record)
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+                if report is None:
+                    raise
+                report.failures.append(err)
+                return None
+            data = response.json()
+            if report is not None:
+                report.responses.append(data)
+            return data
+
+
+def _failure_status(err):
+    "Status and retry-after of a failed httpx request, both None if no response arrived"
+    response = getattr(err, "response", None)
+    if not isinstance(err, httpx.HTTPStatusError) or response is None:
+        return None, None
+    try:
+        retry_after = float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        retry_after = None
+    return response.status_code, retry_after
+
+
+class AsyncSheetProcessor(_BaseSheetProcessor):
+    """Asyncio counterpart of `SheetProcessor`.
+
+    Reading, validation, caching and write packaging are identical to `SheetProcessor`; only the
+    network calls are awaitable. Call `await update_data()` before using `data`.
+
+    Parameters
+    ----------
+    sheet_id : str
+        Spreadsheet id
+    token_file : str or None
+        OAuth token file. None sends requests without credentials, e.g. for a local stand-in
+        or with an API key for public sheets.
+    column_names : list
+        Column names, in sheet order
+    client : AsyncSheetsClient, optional
+        Client to send requests with. By default a new client with default settings.
+
+    Other parameters are as for `SheetProcessor`.
+    """
+
+    def __init__(
+        self,
+        sheet_id,
+        token_file,
+        column_names,
+        first_row=0,
+        first_column="A",
+        sheet_name=None,
+        validation_map=None,
+        secrets_file=None,
+        api_key=None,
+        client=None,
+        cache=None,
+        cache_key=None,
+    ):
+        super().__init__(
+            sheet_id,
+            column_names,
+            first_row=first_row,
+            first_column=first_column,
+            sheet_name=sheet_name,
+            validation_map=validation_map,
+            api_key=api_key,
+            cache=cache,
+            cache_key=cache_key,
+        )
+        self._token_file = token_file
+        self._secrets_file = secrets_file
+        if token_file is not None:
+            default_pool().credentials(token_file, secrets_file)
+        if client is None:
+            client = AsyncSheetsClient()
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client
+
+    def _current_data(self):
+        if self._data is None and not self._load_cached():
+            raise RuntimeError("No data loaded yet, await update_data() first")
+        return self._data
+
+    async def _headers(self):
+        if self._token_file is None:
+            return None
+        # Credentials are cached, but a refresh is a blocking request
+        creds = await asyncio.to_thread(
+            default_pool().credentials, self._token_file, self._secrets_file
+        )
+        return {"Authorization": f"Bearer {creds.token}"}
+
+    def _params(self, **params):
+        if self._key is not None:
+            params["key"] = self._key
+        return params
+
+    def _values_path(self, suffix=""):
+        return f"/v4/spreadsheets/{self._sheet_id}/values{suffix}"
+
+    async def _get_raw(self, range_str):
+        with instrumentation.timed("api_call", method="get", kind="read") as record:
+            raw = await self._client.request(
+                "GET",
+                self._values_path(f"/{quote(range_str, safe='')}"),
+                kind="read",
+                params=self._params(),
+                headers=await self._headers(),
+                record=record,
+            )
+            if record is not None:
+                _record_response(record, raw, [raw])
+        return raw
+
+    async def update_data(self, incremental=False, overlap=5):
+        """Download the sheet data and process it, see `SheetProcessor.update_data`.
+
+        A read that still fails after retries raises its httpx error and keeps the data
+        already loaded.
+        """
+        if self._can_update_tail(incremental):
+            n_check, tail_range = self._tail_range(overlap)
+            raw = await self._get_raw(tail_range)
+            if self._apply_tail(raw, n_check, overlap):
+                return self.data
+        return self._ingest_raw(await self._get_raw(self.sheet_range), overlap)
+
+    async def _send_chunks(self, method, path, bodies, params, concurrent):
+        """Send one request per body, in order and stopping at the first failure unless concurrent.
+
+        Appends are not idempotent, so they are not retried after a transport error.
+        """
+        report = ExecutionReport()
+        headers = await self._headers()
+
+        async def send(body):
+            n_failed = len(report.failures)
+            await self._client.request(
+                "POST",
+                path,
+                kind="write",
+                params=params,
+                json=body,
+                headers=headers,
+                report=report,
+                idempotent=method != "append",
+            )
+            if len(report.failures) > n_failed:
+                report.failures[-1] = (body, report.failures[-1])
+                return False
+            return True
+
+        with instrumentation.timed("api_call", method=method, kind="write") as record:
+            if concurrent:
+                await asyncio.gather(*(send(body) for body in bodies))
+            else:
+                for ii, body in enumerate(bodies):
+                    if not await send(body):
+                        report.unsent = list(bodies[ii + 1 :])
+                        break
+            if record is not None:
+                _record_write(record, bodies, report)
+        return report
+
+    async def set_values(self, rows, columns, values, max_gap=0):
+        "Write values to cells, see `SheetProcessor.set_values`"
+        values = serialize_column(values)
+        body = _package_batch_update(
+            rows, columns, values, self._sheet_name, max_gap=max_gap
+        )
+        # Ranges never overlap after planning, so chunks can be sent concurrently
+        report = await self._send_chunks(
+            "batchUpdate",
+            self._values_path(":batchUpdate"),
+            self._client.executor.split_batch_update(body),
+            self._params(),
+            concurrent=True,
+        )
+        self._after_write()
+        return report
+
+    async def set_value_series(self, s, column_name=None, max_gap=0):
+        rows, columns, values = self._series_cells(s, column_name)
+        return await self.set_values(rows, columns, values, max_gap=max_gap)
+
+    async def append_data(self, data, add_blank_rows=False):
+        """Assume data is same column form as downloaded data"""
+        body = _package_append_data(serialize_frame(data), add_blank_rows)
+        # Appends go after the current end of the table, so chunks are sent in order
+        report = await self._send_chunks(
+            "append",
+            self._values_path(f"/{quote(self.sheet_range, safe='')}:append"),
+            self._client.executor.split_append(body),
+            self._params(
+                valueInputOption="USER_ENTERED", insertDataOption="INSERT_ROWS"
+            ),
+            concurrent=False,
+        )
+        self._after_write()
+        return report
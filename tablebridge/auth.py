@@ -1,4 +1,11 @@
 import os
+import json
+import datetime
+import threading
+import httplib2
+import google_auth_httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -26,6 +33,90 @@ def refresh_credentials(creds, token_file, client_secrets=None):
             creds = flow.run_local_server(port=0)
         else:
             raise Exception("Could not get token")
+    write_token(creds, token_file)
+    return creds
+
+
+def write_token(creds, token_file):
     with open(token_file, "w") as token:
         token.write(creds.to_json())
-    return creds
+
+
+def _expires_within(creds, seconds):
+    if creds.expiry is None:
+        return False
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    return creds.expiry - now < datetime.timedelta(seconds=seconds)
+
+
+class ServicePool:
+    """Thread-safe pool of Sheets API services, keyed by token file.
+
+    Credentials are read from each token file once, kept in memory and refreshed shortly before they
+    expire, so the token file is only rewritten after an actual refresh. Services are built
+    from the static discovery document, which is loaded once, and each thread gets its own
+    service with its own HTTP transport, since httplib2 connections can't be shared across threads.
+
+    Parameters
+    ----------
+    refresh_margin : float, optional
+        Refresh credentials when they expire within this many seconds, by default 300
+    """
+
+    def __init__(self, refresh_margin=300):
+        self._refresh_margin = refresh_margin
+        self._credentials = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._document = None
+
+    def _token_lock(self, token_file):
+        with self._lock:
+            return self._locks.setdefault(token_file, threading.Lock())
+
+    def _discovery_document(self):
+        with self._lock:
+            if self._document is None:
+                self._document = json.loads(get_static_doc("sheets", "v4"))
+            return self._document
+
+    def credentials(self, token_file, client_secrets=None):
+        "Cached credentials for a token file, refreshed if they are invalid or about to expire"
+        with self._token_lock(token_file):
+            creds = self._credentials.get(token_file)
+            if creds is None:
+                creds = get_credentials(token_file, client_secrets)
+            elif not creds.valid:
+                creds = refresh_credentials(creds, token_file, client_secrets)
+            if creds.refresh_token and _expires_within(creds, self._refresh_margin):
+                creds.refresh(Request())
+                write_token(creds, token_file)
+            self._credentials[token_file] = creds
+            return creds
+
+    def service(self, token_file, client_secrets=None):
+        "Sheets service for the calling thread"
+        creds = self.credentials(token_file, client_secrets)
+        services = getattr(self._local, "services", None)
+        if services is None:
+            services = self._local.services = {}
+        if token_file not in services:
+            http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http())
+            services[token_file] = build_from_document(
+                self._discovery_document(), http=http
+            )
+        return services[token_file]
+
+
+_DEFAULT_POOL = None
+_DEFAULT_POOL_LOCK = threading.Lock()
+
+
+def default_pool():
+    "Service pool shared by the whole process"
+    global _DEFAULT_POOL
+    with _DEFAULT_POOL_LOCK:
+        if _DEFAULT_POOL is None:
+            _DEFAULT_POOL = ServicePool()
+        return _DEFAULT_POOL
@@ -0,0 +1,190 @@
+import os
+import glob
+import json
+import time
+import hashlib
+import tempfile
+import pandas as pd
+
+__all__ = ["SheetCache"]
+
+_FORMATS = {
+    "pickle": (".pkl", pd.read_pickle, lambda df, fn: df.to_pickle(fn)),
+    "parquet": (".parquet", pd.read_parquet, lambda df, fn: df.to_parquet(fn)),
+    "feather": (".feather", pd.read_feather, lambda df, fn: df.to_feather(fn)),
+}
+
+
+def _validator_name(func):
+    "Name of a validator that is the same in every process, or None if it has none"
+    if func is None:
+        return "None"
+    module = getattr(func, "__module__", None)
+    name = getattr(func, "__qualname__", None)
+    # Lambdas and nested functions share names like "<lambda>", and partials and callable
+    # objects only have a repr with a memory address
+    if module is None or name is None or "<" in name:
+        return None
+    return f"{module}.{name}"
+
+
+class SheetCache:
+    """Local on-disk cache of processed sheet data.
+
+    Each entry stores the processed dataframe along with the time it was downloaded, keyed by
+    spreadsheet id, range and column schema.
+
+    Every save writes its dataframe to a new file and then replaces the metadata file, which
+    names the data file it belongs to. Readers therefore always see matching data and
+    metadata, and several processes can save the same key at once.
+
+    Parameters
+    ----------
+    directory : str
+        Directory for cache files. Created if it does not exist.
+    ttl : float or None, optional
+        Seconds after download that an entry is still fresh. None keeps entries until they are
+        invalidated. By default None.
+    format : str, optional
+        "pickle", "parquet" or "feather". Parquet and feather need pyarrow and cannot store
+        point or list-valued columns. By default "pickle".
+    """
+
+    def __init__(self, directory, ttl=None, format="pickle"):
+        if format not in _FORMATS:
+            raise ValueError(f"format must be one of {list(_FORMATS.keys())}")
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._ttl = ttl
+        self._format = format
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @property
+    def ttl(self):
+        return self._ttl
+
+    @staticmethod
+    def key(sheet_id, sheet_range, column_names, validation_map=None):
+        """Cache key for a sheet range and column schema.
+
+        Validators are identified by module and qualified name, so they must be module-level
+        functions or wrap one, e.g. with `validation.with_dtype`.
+
+        Raises
+        ------
+        ValueError
+            If a validator has no stable name, e.g. a lambda or a functools.partial. Pass an
+            explicit `cache_key` to the processor instead.
+        """
+        if validation_map is None:
+            validation_map = {}
+        names = []
+        for c in column_names:
+            name = _validator_name(validation_map.get(c))
+            if name is None:
+                raise ValueError(
+                    f"The validator of column {c!r} has no stable name to key the cache by, "
+                    "use a module-level function or pass an explicit cache_key"
+                )
+            names.append(name)
+        schema = [sheet_id, sheet_range, [str(c) for c in column_names], names]
+        return hashlib.sha1(json.dumps(schema).encode()).hexdigest()
+
+    def _data_file(self, key, meta=None):
+        if meta is not None and "data_file" in meta:
+            return os.path.join(self._directory, meta["data_file"])
+        return os.path.join(self._directory, key + _FORMATS[self._format][0])
+
+    def _meta_file(self, key):
+        return os.path.join(self._directory, key + ".json")
+
+    def _read_meta(self, key):
+        try:
+            with open(self._meta_file(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _meta_is_fresh(self, meta):
+        if meta is None or meta.get("format") != self._format:
+            return False
+        if self._ttl is None:
+            return True
+        return time.time() - meta["fetched_at"] <= self._ttl
+
+    def is_fresh(self, key):
+        return self._meta_is_fresh(self._read_meta(key))
+
+    def load(self, key):
+        """Load a fresh entry.
+
+        Any failure to read the entry, e.g. a missing or truncated file, counts as a miss.
+
+        Returns
+        -------
+        tuple or None
+            (dataframe, metadata dict) if a fresh entry exists, otherwise None.
+        """
+        meta = self._read_meta(key)
+        if not self._meta_is_fresh(meta):
+            return None
+        try:
+            df = _FORMATS[self._format][1](self._data_file(key, meta))
+        except Exception:
+            return None
+        return df, meta
+
+    def _temp_file(self, key, suffix):
+        fd, filename = tempfile.mkstemp(
+            prefix=f"{key}.", suffix=suffix, dir=self._directory
+        )
+        os.close(fd)
+        return filename
+
+    def save(self, key, df, fetched_at=None, **meta):
+        """Store a dataframe and its download time. Extra keyword arguments are kept in the metadata."""
+        if fetched_at is None:
+            fetched_at = time.time()
+        data_file = self._temp_file(key, _FORMATS[self._format][0])
+        meta_file = self._temp_file(key, ".json.tmp")
+        try:
+            _FORMATS[self._format][2](df, data_file)
+            meta = {
+                **meta,
+                "fetched_at": fetched_at,
+                "format": self._format,
+                "data_file": os.path.basename(data_file),
+            }
+            with open(meta_file, "w") as f:
+                json.dump(meta, f)
+            os.replace(meta_file, self._meta_file(key))
+        except BaseException:
+            for fn in (data_file, meta_file):
+                _remove(fn)
+            raise
+
+        # Remove data files of earlier saves. One that another process is still writing
+        # may go too, which only makes its entry a miss.
+        keep = {data_file, self._data_file(key, self._read_meta(key))}
+        pattern = os.path.join(
+            glob.escape(self._directory), f"{key}.*{_FORMATS[self._format][0]}"
+        )
+        for fn in glob.glob(pattern):
+            if fn not in keep:
+                _remove(fn)
+
+    def invalidate(self, key):
+        "Remove an entry, e.g. after writing to the sheet"
+        _remove(self._meta_file(key))
+        for fn in glob.glob(os.path.join(glob.escape(self._directory), f"{key}.*")):
+            _remove(fn)
+
+
+def _remove(filename):
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        pass
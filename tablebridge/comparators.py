@@ -0,0 +1,211 @@
+"""Column comparators for `AnnotationComparison`.
+
+A comparator takes two aligned columns and returns a boolean array that is True where the
+values differ. Cells where both values are missing count as equal and cells where exactly
+one is missing differ, as in `utils.column_differs`.
+"""
+import numpy as np
+import pandas as pd
+
+from .utils import column_differs
+from .validation import is_listlike
+
+__all__ = [
+    "exact",
+    "numeric_tolerance",
+    "coerced_equality",
+    "normalized_text",
+    "unordered_list",
+]
+
+_INTEGER_PATTERN = r"^[+-]?[0-9]+$"
+_FLOAT_PATTERN = r"^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][+-]?[0-9]+)?$|^[+-]?(inf|nan)$"
+
+
+def _present_comparator(differs_present):
+    "Comparator that applies differs_present to the cells where both values are present"
+
+    def comparator(col_a, col_b):
+        na_a = col_a.isna().to_numpy()
+        na_b = col_b.isna().to_numpy()
+        differs = na_a != na_b
+        both_valid = ~(na_a | na_b)
+        if np.any(both_valid):
+            differs[both_valid] = differs_present(
+                col_a[both_valid].reset_index(drop=True),
+                col_b[both_valid].reset_index(drop=True),
+            )
+        return differs
+
+    return comparator
+
+
+def exact(col_a, col_b):
+    "Values must be equal, see `utils.column_differs`"
+    return column_differs(col_a, col_b)
+
+
+def _as_float(col):
+    "Float values, with NaN where a value is not numeric"
+    if col.dtype.kind in "biuf":
+        return col.to_numpy(dtype=float, na_value=np.nan)
+    return pd.to_numeric(col.astype(object), errors="coerce").to_numpy(
+        dtype=float, na_value=np.nan
+    )
+
+
+def numeric_tolerance(rtol=1e-9, atol=0.0):
+    """Comparator treating numbers within a tolerance as equal.
+
+    Numeric strings are parsed, so 0.30000000000000004 and "0.3" are equal. Cells that are
+    not numeric on either side fall back to exact comparison.
+
+    Parameters
+    ----------
+    rtol : float, optional
+        Relative tolerance, by default 1e-9
+    atol : float, optional
+        Absolute tolerance, by default 0
+
+    Returns
+    -------
+    callable
+        Comparator
+    """
+
+    def differs_present(a, b):
+        float_a = _as_float(a)
+        float_b = _as_float(b)
+        numeric = ~(np.isnan(float_a) | np.isnan(float_b))
+        differs = np.empty(len(a), dtype=bool)
+        differs[numeric] = ~np.isclose(
+            float_a[numeric], float_b[numeric], rtol=rtol, atol=atol
+        )
+        if not np.all(numeric):
+            differs[~numeric] = exact(a[~numeric], b[~numeric])
+        return differs
+
+    return _present_comparator(differs_present)
+
+
+def _float_text(numbers):
+    "Text of floats, with integral values written like integers within the range floats hold exactly"
+    out = numbers.astype(str).astype(object)
+    integral = (
+        np.isfinite(numbers) & (numbers == np.round(numbers)) & (np.abs(numbers) < 2**53)
+    )
+    out[integral] = numbers[integral].astype(np.int64).astype(str)
+    return out
+
+
+def _integer_text(text):
+    "Integer strings without a plus sign, leading zeros or negative zero, like str(int(x))"
+    digits = text.str.lstrip("+-").str.lstrip("0").replace("", "0")
+    negative = text.str.startswith("-") & (digits != "0")
+    return digits.where(~negative, "-" + digits).to_numpy(dtype=object)
+
+
+def _canonical_text(col):
+    """String form of each value in which equal numbers have equal text.
+
+    Integers keep every digit, so large uint64 ids are not rounded through floats.
+    """
+    values = col.to_numpy()
+    if values.dtype.kind in "biu":
+        return values.astype(str).astype(object)
+    if values.dtype.kind == "f":
+        return _float_text(values)
+
+    # Columns repeat values a lot, so only the distinct strings are normalized. The str of a
+    # float never looks like an integer, so floats and their text normalize alike.
+    text = pd.Series(col.to_numpy(dtype=object), dtype=object).map(str)
+    codes, uniques = pd.factorize(text)
+    text = pd.Series(uniques, dtype=object).str.strip()
+    out = text.to_numpy(dtype=object, copy=True)
+    is_int = text.str.fullmatch(_INTEGER_PATTERN).to_numpy(dtype=bool)
+    if np.any(is_int):
+        out[is_int] = _integer_text(text[is_int])
+
+    is_number = ~is_int & text.str.fullmatch(_FLOAT_PATTERN, case=False).to_numpy(
+        dtype=bool
+    )
+    if np.any(is_number):
+        # Casting the strings parses each with float(), so no digit is lost
+        out[is_number] = _float_text(out[is_number].astype(float))
+    return out[codes]
+
+
+def coerced_equality():
+    """Comparator that compares values by text after normalizing numbers.
+
+    1, 1.0, "1" and " 1 " are all equal, as are 0.5 and "0.50". Integers are compared by
+    all of their digits.
+
+    Returns
+    -------
+    callable
+        Comparator
+    """
+
+    def differs_present(a, b):
+        return _canonical_text(a) != _canonical_text(b)
+
+    return _present_comparator(differs_present)
+
+
+def normalized_text(case=False, whitespace=False):
+    """Comparator for text that ignores case and extra whitespace.
+
+    Parameters
+    ----------
+    case : bool, optional
+        If True, case matters, by default False
+    whitespace : bool, optional
+        If True, whitespace matters. Otherwise leading and trailing whitespace is removed and
+        runs of whitespace count as a single space. By default False.
+
+    Returns
+    -------
+    callable
+        Comparator
+    """
+
+    def normalize(col):
+        s = pd.Series(col.to_numpy(dtype=object), dtype=object).map(str)
+        if not whitespace:
+            s = s.str.strip().str.replace(r"\s+", " ", regex=True)
+        if not case:
+            s = s.str.casefold()
+        return s.to_numpy(dtype=object)
+
+    def differs_present(a, b):
+        return normalize(a) != normalize(b)
+
+    return _present_comparator(differs_present)
+
+
+def _sorted_items(x):
+    if is_listlike(x):
+        return tuple(sorted(str(v) for v in x))
+    return (str(x),)
+
+
+def unordered_list():
+    """Comparator for list-valued cells that ignores the order of items.
+
+    Items are compared by their text, counting repeats. A scalar equals a one-item list.
+
+    Returns
+    -------
+    callable
+        Comparator
+    """
+
+    def differs_present(a, b):
+        keys_a = [_sorted_items(x) for x in a.to_numpy(dtype=object)]
+        keys_b = [_sorted_items(x) for x in b.to_numpy(dtype=object)]
+        return np.fromiter(
+            (ka != kb for ka, kb in zip(keys_a, keys_b)), dtype=bool, count=len(keys_a)
+        )
+
+    return _present_comparator(differs_present)
@@ -1,19 +1,107 @@
+import itertools
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 import dfbridge
+from dfbridge.dfbridge import make_longform_schema
 
-from .utils import row_differs
+from .hashing import _column_hashes
+from .utils import column_differs, rows_differ
+from .validation import is_listlike
 from . import comparison_functions as func
+from . import instrumentation
 
 __all__ = [
     "fill_column_from_above",
     "convert_dataframe",
     "AnnotationComparison",
+    "DiffResult",
+    "partitioned_diff",
     "func",
 ]
 
 
-def fill_column_from_above(df, columns, starting_value=None, inplace=False):
+def _lists_with_na(cells):
+    "Whether each list-valued cell contains a missing value, like np.any(pd.isna(x)) per cell"
+    lengths = np.fromiter(map(len, cells), dtype=np.int64, count=len(cells))
+    # An object array keeps NaN next to strings as NaN, where np.concatenate would make it "nan"
+    items = np.fromiter(
+        itertools.chain.from_iterable(cells), dtype=object, count=lengths.sum()
+    )
+    if any(map(is_listlike, items)):
+        # Nested cells
+        return np.array([np.any(pd.isna(x)) for x in cells], dtype=bool)
+    out = np.zeros(len(cells), dtype=bool)
+    nonempty = lengths > 0
+    if np.any(nonempty):
+        offsets = np.cumsum(lengths) - lengths
+        out[nonempty] = (
+            np.add.reduceat(pd.isna(items).astype(np.int64), offsets[nonempty]) > 0
+        )
+    return out
+
+
+def _missing_mask(col):
+    missing = col.isna().to_numpy(copy=True)
+    if col.dtype == object:
+        values = col.to_numpy()
+        listlike = np.fromiter(map(is_listlike, values), dtype=bool, count=len(values))
+        if np.any(listlike):
+            missing[listlike] = _lists_with_na(values[listlike])
+    return missing
+
+
+def _run_starts(df, groupby):
+    "Position of the first row of the contiguous run of equal groupby values each row belongs to"
+    n = len(df)
+    if groupby is None:
+        return np.zeros(n, dtype=int)
+    codes = df.groupby(groupby, sort=False, dropna=False).ngroup().to_numpy()
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = codes[1:] != codes[:-1]
+    starts = np.flatnonzero(is_start)
+    return starts[np.cumsum(is_start) - 1]
+
+
+def _fill_values(col, run_start, starting_value, limit):
+    n = len(col)
+    positions = np.arange(n)
+    missing = _missing_mask(col)
+
+    # Most recent non-missing position at or above each row, only counted inside the row's own run.
+    last_valid = np.maximum.accumulate(np.where(missing, -1, positions))
+    has_source = last_valid >= run_start
+    # Leading rows of a run are filled from a virtual starting value just above the run.
+    distance = positions - np.where(has_source, last_valid, run_start - 1)
+    to_fill = missing if limit is None else missing & (distance <= limit)
+
+    values = col.to_numpy(dtype=object)
+    filled = values.copy()
+    from_above = to_fill & has_source
+    filled[from_above] = values[last_valid[from_above]]
+
+    # Without a starting value, leading cells are already missing and only need normalizing in object columns.
+    if starting_value is not None or col.dtype == object:
+        leading = to_fill & ~has_source
+        start = np.empty(1, dtype=object)
+        start[0] = pd.NA if starting_value is None else starting_value
+        filled[leading] = start[np.zeros(np.count_nonzero(leading), dtype=int)]
+
+    filled = pd.Series(filled, index=col.index, name=col.name)
+    if col.dtype != object:
+        try:
+            filled = filled.astype(col.dtype)
+        except (TypeError, ValueError):
+            filled = filled.infer_objects()
+    return filled
+
+
+def fill_column_from_above(
+    df, columns, starting_value=None, inplace=False, groupby=None, limit=None
+):
     """Fill in a column in order with the last non-NAN value
 
     Parameters
@@ -23,38 +111,38 @@ def fill_column_from_above(df, columns, starting_value=None, inplace=False):
     columns : str or list
         Column name or list of column names
     starting_value : object
-        Initial value to use if there is none.
+        Initial value to use if there is none. Falsy values such as 0 or "" count as no
+        starting value, so leading missing rows stay NA.
     inplace : bool, optional
         If True, make changes in place, by default False
+    groupby : str or list, optional
+        Column name or list of column names. If set, filling restarts wherever their values
+        change from one row to the next, using the starting value at the top of each run.
+        By default None.
+    limit : int, optional
+        If set, fill at most this many rows below each value. By default None.
 
     Returns
     -------
     df
         Dataframe with new data
     """
-    if inplace:
+    if not inplace:
         df = df.copy()
 
     if isinstance(columns, str):
         columns = [columns]
 
-    for column in columns:
-        last_value = df[column].iloc[0]
-        if np.any(pd.isna(last_value)):
-            if not starting_value:
-                last_value = pd.NA
-            else:
-                last_value = starting_value
+    if not starting_value:
+        starting_value = None
 
-        for idx, val in df[column].items():
-            if np.any(pd.isna(val)):
-                df.at[idx, column] = last_value
-            else:
-                last_value = val
+    run_start = _run_starts(df, groupby)
+    for column in columns:
+        df[column] = _fill_values(df[column], run_start, starting_value, limit)
     return df
 
 
-def convert_dataframe(df, schema):
+def convert_dataframe(df, schema, n_workers=None, chunk_size=None, pool="process"):
     """Convert dataframe following a schema allowing for renaming, remapping, and applying functions
     to the data in the dataframe passed.
 
@@ -92,14 +180,150 @@ def convert_dataframe(df, schema):
             }
 
         Simple renaming and applying can be also done by using `"final_name": "original_name"` or `"final_name": function` items.
+    n_workers : int or None, optional
+        If set, "apply" columns are computed over chunks of rows by this many workers and
+        reassembled in the original order. By default None, which applies serially.
+    chunk_size : int or None, optional
+        Rows per chunk when n_workers is set, by default one chunk per worker.
+    pool : str, optional
+        "process" or "thread", by default "process". Threads only help functions that
+        release the GIL. With processes, functions that cannot be pickled (e.g. lambdas)
+        are run in the calling process while the workers run the rest.
+
+        Functions with a reserve(n) method, like `func.count_from`, are given a separate
+        block of their sequence for each chunk, so the values match a serial run.
+
+    Functions with a column(index) method, like those in `func`, are not applied per row.
+    Their whole column is taken from column(df.index) instead.
 
     Returns
     -------
     df_converted
         New dataframe with columns and data based on the schema.
     """
-    dbb = dfbridge.DataframeBridge(schema)
-    return dbb.reformat(df)
+    if n_workers is not None and n_workers < 1:
+        raise ValueError(f"n_workers must be at least 1, not {n_workers}")
+    if chunk_size is not None and chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, not {chunk_size}")
+    with instrumentation.timed("stage", name="convert_dataframe", rows=len(df)):
+        if schema is not None and len(df) > 0:
+            schema = make_longform_schema(schema)
+            df, schema = _generate_columns(df, schema)
+            if n_workers is not None:
+                df, schema = _apply_in_chunks(df, schema, n_workers, chunk_size, pool)
+        dbb = dfbridge.DataframeBridge(schema)
+        return dbb.reformat(df)
+
+
+def _generate_columns(df, schema):
+    "Compute the apply entries whose function has a column(index) method"
+    values = {}
+    for column, entry in schema.items():
+        func = entry.get("func")
+        if entry["type"] == "apply" and hasattr(func, "column"):
+            try:
+                values[column] = func.column(df.index)
+            except Exception as err:
+                values[column] = err
+    return _rename_from_values(df, schema, values)
+
+
+def _apply_chunk(chunk, funcs):
+    "Values of each function over the rows of a chunk, or the exception it raised"
+    out = {}
+    for column, func in funcs.items():
+        try:
+            out[column] = chunk.apply(func, axis=1).tolist()
+        except Exception as err:
+            out[column] = err
+    return out
+
+
+def _picklable(obj):
+    try:
+        pickle.dumps(obj)
+    except Exception:
+        return False
+    return True
+
+
+def _apply_in_chunks(df, schema, n_workers, chunk_size, pool):
+    "Compute the apply entries of a long-form schema in a worker pool"
+    if pool not in ("process", "thread"):
+        raise ValueError(f'pool must be "process" or "thread", not {pool!r}')
+    apply_funcs = {k: v["func"] for k, v in schema.items() if v["type"] == "apply"}
+    if not apply_funcs:
+        return df, schema
+    if chunk_size is None:
+        chunk_size = -(-len(df) // n_workers)
+
+    chunks = []
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start : start + chunk_size]
+        funcs = {
+            k: f.reserve(len(chunk)) if hasattr(f, "reserve") else f
+            for k, f in apply_funcs.items()
+        }
+        chunks.append((chunk, funcs))
+
+    local = set()
+    if pool == "process":
+        local = {k for k, f in chunks[0][1].items() if not _picklable(f)}
+    Pool = ProcessPoolExecutor if pool == "process" else ThreadPoolExecutor
+    results = {k: [] for k in apply_funcs}
+    with Pool(max_workers=n_workers) as executor:
+        futures = [
+            executor.submit(
+                _apply_chunk, chunk, {k: f for k, f in funcs.items() if k not in local}
+            )
+            for chunk, funcs in chunks
+        ]
+        for future, (chunk, funcs) in zip(futures, chunks):
+            out = _apply_chunk(chunk, {k: f for k, f in funcs.items() if k in local})
+            out.update(future.result())
+            for column, values in out.items():
+                results[column].append(values)
+
+    values = {}
+    for column, parts in results.items():
+        errors = [x for x in parts if isinstance(x, Exception)]
+        if errors:
+            values[column] = errors[0]
+        else:
+            values[column] = pd.Series([x for part in parts for x in part], index=df.index)
+    return _rename_from_values(df, schema, values)
+
+
+def _rename_from_values(df, schema, values):
+    """Put precomputed apply values into temporary columns of df.
+
+    Returns df and the schema with those entries rewritten to rename the temporary columns,
+    keeping their remapping, type and fill_missing handling. A value that is an exception is
+    handled like one raised by the apply.
+    """
+    if not values:
+        return df, schema
+    df = df.copy(deep=False)
+    schema = dict(schema)
+    for column, value in values.items():
+        entry = {k: v for k, v in schema[column].items() if k != "func"}
+        entry["type"] = "rename"
+        entry["from"] = _unused_name(df.columns, f"{column}__applied")
+        if isinstance(value, Exception):
+            # Leaving the column out fills it with NA, as a failed serial apply does
+            if not entry.get("fill_missing", True):
+                raise value
+        else:
+            df[entry["from"]] = value
+        schema[column] = entry
+    return df, schema
+
+
+def _unused_name(columns, name):
+    ii = 0
+    while f"{name}_{ii}" in columns:
+        ii += 1
+    return f"{name}_{ii}"
 
 
 # def convert_dataframe(df, schema):
@@ -161,12 +385,31 @@ def convert_dataframe(df, schema):
 
 
 class AnnotationComparison:
-    def __init__(self, new_df, old_df, id_column):
+    """Compare a new and an old annotation table by id.
+
+    Parameters
+    ----------
+    new_df : pd.DataFrame
+        New annotations
+    old_df : pd.DataFrame
+        Old annotations
+    id_column : str
+        Name of the id column
+    comparators : dict, optional
+        Comparator for some data columns, keyed by column name, e.g. from `comparators`.
+        Other columns must match exactly. By default None.
+    """
+
+    def __init__(self, new_df, old_df, id_column, comparators=None):
         self._new_df = new_df
         self._old_df = old_df
         self._outer_merged_df = None
         self._common_merged_df = None
+        self._diff_result = None
         self._id_column = id_column
+        if comparators is None:
+            comparators = {}
+        self._comparators = comparators
         if len(self.data_columns) == 0:
             raise ValueError(
                 "DataFrames must have at least one data column beyond the index"
@@ -190,6 +433,13 @@ class AnnotationComparison:
     def id_column(self):
         return self._id_column
 
+    @property
+    def comparators(self):
+        return self._comparators
+
+    def _comparator(self, column):
+        return self._comparators.get(column, column_differs)
+
     @property
     def data_columns_new(self):
         return [f"{x}_new" for x in self.data_columns]
@@ -227,28 +477,309 @@ class AnnotationComparison:
     def old_id_column(self):
         return f"{self._index_column_new}_old"
 
+    def diff(self):
+        """Classify every annotation as new, removed, changed or unchanged in a single pass.
+
+        Returns
+        -------
+        DiffResult
+            Id sets for each category, with row views built lazily from the new and old dataframes.
+        """
+        if self._diff_result is None:
+            self._diff_result = self._compute_diff()
+        return self._diff_result
+
+    def _compute_diff(self):
+        with instrumentation.timed(
+            "stage", name="annotation_comparison", rows=len(self._new_df)
+        ):
+            return self._compare()
+
+    def _compare(self):
+        # Only the id columns go through the outer merge, so data columns are never upcast by missing rows.
+        id_merged = self._new_df[[self._id_column]].merge(
+            self._old_df[[self._id_column]],
+            on=self._id_column,
+            how="outer",
+            validate="1:1",
+            indicator=True,
+        )
+        side = id_merged["_merge"].to_numpy()
+        ids = id_merged[self._id_column].to_numpy()
+
+        common = self.common_merged_df
+        row_is_diff = rows_differ(
+            common,
+            self.data_columns_new,
+            self.data_columns_old,
+            [self._comparator(c) for c in self.data_columns],
+        )
+        common_ids = common[self._id_column].to_numpy()
+
+        return DiffResult(
+            self._id_column,
+            new_ids=ids[side == "left_only"],
+            removed_ids=ids[side == "right_only"],
+            changed_ids=common_ids[row_is_diff],
+            unchanged_ids=common_ids[~row_is_diff],
+            new_df=self._new_df,
+            old_df=self._old_df,
+        )
+
+    def changed_cells(self, row_mapping=None):
+        """Long table of the individual cells that differ between changed annotations.
+
+        Parameters
+        ----------
+        row_mapping : dict or pd.Series, optional
+            Mapping from id to sheet row number, e.g. the `table_row` of each id in the sheet data.
+            If set, a "row" column is added. By default None.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per changed cell with the id column and "column", "old_value" and "new_value"
+            columns, ordered by annotation and then by data column.
+        """
+        changed_ids = self.diff().changed_ids
+        with instrumentation.timed("stage", name="changed_cells", rows=len(changed_ids)):
+            return self._changed_cells(changed_ids, row_mapping)
+
+    def _changed_cells(self, changed_ids, row_mapping):
+        common = self.common_merged_df
+        common = common[common[self._id_column].isin(changed_ids)]
+
+        positions, column_inds, old_values, new_values = [], [], [], []
+        for ii, column in enumerate(self.data_columns):
+            diff = self._comparator(column)(
+                common[f"{column}_new"], common[f"{column}_old"]
+            )
+            where = np.flatnonzero(diff)
+            positions.append(where)
+            column_inds.append(np.full(len(where), ii))
+            old_values.append(common[f"{column}_old"].to_numpy(dtype=object)[where])
+            new_values.append(common[f"{column}_new"].to_numpy(dtype=object)[where])
+
+        positions = np.concatenate(positions)
+        column_inds = np.concatenate(column_inds)
+        order = np.lexsort((column_inds, positions))
+        cells = pd.DataFrame(
+            {
+                self._id_column: common[self._id_column].to_numpy()[positions[order]],
+                "column": np.asarray(self.data_columns, dtype=object)[
+                    column_inds[order]
+                ],
+                "old_value": np.concatenate(old_values)[order],
+                "new_value": np.concatenate(new_values)[order],
+            }
+        )
+        if row_mapping is not None:
+            row_mapping = pd.Series(row_mapping)
+            cells["row"] = row_mapping.reindex(cells[self._id_column]).to_numpy()
+        return cells
+
+    def iter_diff(self, n_partitions=16):
+        """Compare the tables one id-hash bucket at a time, see `partitioned_diff`.
+
+        Yields
+        ------
+        DiffResult
+            Comparison result for each bucket.
+        """
+        return partitioned_diff(
+            self._new_df,
+            self._old_df,
+            self._id_column,
+            n_partitions=n_partitions,
+            comparators=self._comparators,
+        )
+
     def new_annotations(self):
-        not_in_old = ~np.isin(self.new_df[self.id_column], self.old_df[self.id_column])
-        return self.new_df[not_in_old]
+        return self.diff().new_annotations
 
     def removed_annotations(self):
-        not_in_new = ~np.isin(self.old_df[self.id_column], self.new_df[self.id_column])
-        return self.old_df[not_in_new]
+        return self.diff().removed_annotations
 
     def changed_annotations(self):
-        row_is_diff = self.common_merged_df.apply(
-            lambda x: row_differs(x, self.data_columns_new, self.data_columns_old),
-            axis=1,
-        )
-        common_ids = self.common_merged_df[row_is_diff][self.id_column]
-        return self.new_df.query(f"{self.id_column} in @common_ids")
+        return self.diff().changed_annotations
 
     def unchanged_annotations(self):
-        changed_df = self.changed_annotations()[self.id_column]
-        removed_df = self.removed_annotations()[self.id_column]
-        altered_ids = np.concatenate((changed_df, removed_df))
+        return self.diff().unchanged_annotations
+
+
+class DiffResult:
+    """Result of comparing two annotation tables.
+
+    Holds the ids of new, removed, changed and unchanged annotations. The corresponding rows
+    are only selected from the source dataframes when first accessed.
+
+    Parameters
+    ----------
+    id_column : str
+        Name of the id column
+    new_ids, removed_ids, changed_ids, unchanged_ids : array-like
+        Ids in each category.
+    new_df : pd.DataFrame, optional
+        Dataframe that new and changed rows are taken from.
+    old_df : pd.DataFrame, optional
+        Dataframe that removed and unchanged rows are taken from.
+    """
 
-        all_ids = self.old_df[self.id_column].values
-        unchanged_ids = all_ids[~np.isin(all_ids, altered_ids)]
+    def __init__(
+        self,
+        id_column,
+        new_ids,
+        removed_ids,
+        changed_ids,
+        unchanged_ids,
+        new_df=None,
+        old_df=None,
+    ):
+        self._id_column = id_column
+        self._new_ids = np.asarray(new_ids)
+        self._removed_ids = np.asarray(removed_ids)
+        self._changed_ids = np.asarray(changed_ids)
+        self._unchanged_ids = np.asarray(unchanged_ids)
+        self._new_df = new_df
+        self._old_df = old_df
+        self._views = {}
+
+    @property
+    def id_column(self):
+        return self._id_column
+
+    @property
+    def new_ids(self):
+        return self._new_ids
+
+    @property
+    def removed_ids(self):
+        return self._removed_ids
+
+    @property
+    def changed_ids(self):
+        return self._changed_ids
+
+    @property
+    def unchanged_ids(self):
+        return self._unchanged_ids
 
-        return self.old_df.query(f"{self.id_column} in @unchanged_ids")
+    @property
+    def new_annotations(self):
+        return self._view("new", self._new_df, self._new_ids)
+
+    @property
+    def removed_annotations(self):
+        return self._view("removed", self._old_df, self._removed_ids)
+
+    @property
+    def changed_annotations(self):
+        return self._view("changed", self._new_df, self._changed_ids)
+
+    @property
+    def unchanged_annotations(self):
+        return self._view("unchanged", self._old_df, self._unchanged_ids)
+
+    def _view(self, name, df, ids):
+        if df is None:
+            return None
+        if name not in self._views:
+            self._views[name] = df[df[self._id_column].isin(ids)]
+        return self._views[name]
+
+    def summary(self):
+        "Number of annotations in each category"
+        return {
+            "new": len(self._new_ids),
+            "removed": len(self._removed_ids),
+            "changed": len(self._changed_ids),
+            "unchanged": len(self._unchanged_ids),
+        }
+
+
+def _bucket_ids(ids, n_partitions):
+    # Ids that merge as equal, e.g. 1 and 1.0, must land in the same bucket on both sides
+    hashes = _column_hashes(pd.Series(ids))
+    return (hashes % np.uint64(n_partitions)).astype(np.int64)
+
+
+def _memory_buckets(df, id_column, n_partitions):
+    buckets = _bucket_ids(df[id_column], n_partitions)
+    positions = pd.Series(np.arange(len(df))).groupby(buckets).indices
+    empty = np.array([], dtype=np.int64)
+    return lambda b: df.iloc[positions.get(b, empty)]
+
+
+def _spill_buckets(chunks, id_column, n_partitions, directory, label):
+    template = None
+    counts = np.zeros(n_partitions, dtype=int)
+    for chunk in chunks:
+        if template is None:
+            template = chunk.iloc[:0]
+        buckets = _bucket_ids(chunk[id_column], n_partitions)
+        for b, part in chunk.groupby(buckets, sort=False):
+            part.to_pickle(os.path.join(directory, f"{label}_{b}_{counts[b]}.pkl"))
+            counts[b] += 1
+    if template is None:
+        raise ValueError(f"No data chunks were provided for the {label} table")
+
+    def load_bucket(b):
+        parts = [
+            pd.read_pickle(os.path.join(directory, f"{label}_{b}_{ii}.pkl"))
+            for ii in range(counts[b])
+        ]
+        if len(parts) == 0:
+            return template
+        return pd.concat(parts, ignore_index=True)
+
+    return load_bucket
+
+
+def partitioned_diff(
+    new_data, old_data, id_column, n_partitions=16, spill_dir=None, comparators=None
+):
+    """Compare two annotation tables one bucket at a time, with buckets set by a hash of the id column.
+
+    Every id lands in the same bucket on both sides, so new/removed/changed/unchanged results
+    are the same as for a full `AnnotationComparison`, but only one bucket is merged at a time.
+
+    Parameters
+    ----------
+    new_data : pd.DataFrame or iterable of pd.DataFrame
+        New table, either in memory or as an iterable of chunks (e.g. from `pd.read_csv(..., chunksize=...)`).
+    old_data : pd.DataFrame or iterable of pd.DataFrame
+        Old table, in the same forms as new_data.
+    id_column : str
+        Name of the id column
+    n_partitions : int, optional
+        Number of buckets, by default 16
+    spill_dir : str or None, optional
+        Directory where chunked inputs are written bucket by bucket. By default, a temporary
+        directory that is removed once the generator finishes. Unused for in-memory dataframes.
+    comparators : dict, optional
+        Comparator for some data columns, see `AnnotationComparison`. By default None.
+
+    Yields
+    ------
+    DiffResult
+        Comparison result for each non-empty bucket.
+    """
+    with tempfile.TemporaryDirectory(dir=spill_dir) as directory:
+        buckets = []
+        for label, data in (("new", new_data), ("old", old_data)):
+            if isinstance(data, pd.DataFrame):
+                buckets.append(_memory_buckets(data, id_column, n_partitions))
+            else:
+                buckets.append(
+                    _spill_buckets(data, id_column, n_partitions, directory, label)
+                )
+        new_bucket, old_bucket = buckets
+
+        for b in range(n_partitions):
+            new_df = new_bucket(b)
+            old_df = old_bucket(b)
+            if len(new_df) == 0 and len(old_df) == 0:
+                continue
+            yield AnnotationComparison(
+                new_df, old_df, id_column, comparators=comparators
+            ).diff()
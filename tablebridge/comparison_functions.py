@@ -1,5 +1,11 @@
+import numbers
+import numpy as np
 import pandas as pd
-import itertools
+
+from .validation import is_listlike
+
+# Row functions here also have a column(index) method giving the values for a whole frame
+# at once, which `convert_dataframe` uses instead of calling them row by row.
 
 
 def nanf(*args):
@@ -7,12 +13,22 @@ def nanf(*args):
     return pd.NA
 
 
+def _constant_column(value, index):
+    if value is None or is_listlike(value):
+        return pd.Series([value] * len(index), index=index)
+    return pd.Series(value, index=index)
+
+
+nanf.column = lambda index: _constant_column(pd.NA, index)
+
+
 def constant(value):
     "Returns a function that returns a constant for every row"
 
     def func(*args):
         return value
 
+    func.column = lambda index: _constant_column(value, index)
     return func
 
 
@@ -32,13 +48,54 @@ def count_from(start, step=1, prefix=None):
     -------
     function
         Function that returns the next element in the list described above.
+        Its reserve(n) method returns a separate counter for the next n elements and skips
+        past them, which lets `convert_dataframe` count chunks of rows in parallel.
     """
-    counter = itertools.count(start, step=step)
+    counter = _Counter(start, step, prefix)
 
     def func(*args):
-        if prefix:
-            return f"{prefix}{next(counter)}"
-        else:
-            return next(counter)
+        return counter()
+
+    def reserve(n):
+        block = _Counter(counter.value, step, prefix)
+        counter.value += n * step
+        return block
 
+    def column(index):
+        return pd.Series(reserve(len(index)).values(len(index)), index=index)
+
+    func.reserve = reserve
+    func.column = column
     return func
+
+
+class _Counter:
+    "Picklable counter state behind `count_from`"
+
+    __slots__ = ("value", "step", "prefix")
+
+    def __init__(self, value, step, prefix):
+        self.value = value
+        self.step = step
+        self.prefix = prefix
+
+    def __call__(self, *args):
+        value = self.value
+        self.value += self.step
+        if self.prefix:
+            return f"{self.prefix}{value}"
+        else:
+            return value
+
+    def values(self, n):
+        "The next n values, as an array where the counter fits in int64"
+        int_counter = isinstance(self.value, numbers.Integral) and isinstance(
+            self.step, numbers.Integral
+        )
+        if not int_counter or abs(self.value) + abs(self.step) * n >= 2**63:
+            return [self() for _ in range(n)]
+        out = self.value + self.step * np.arange(n, dtype=np.int64)
+        self.value += n * self.step
+        if self.prefix:
+            return np.char.add(str(self.prefix), out.astype(str))
+        return out
@@ -0,0 +1,409 @@
+import re
+import json
+import asyncio
+import time
+import random
+import threading
+from .auth import HttpError
+from . import instrumentation
+
+__all__ = ["RequestExecutor", "TokenBucket", "ExecutionReport", "default_executor"]
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Default Sheets API quotas, in requests per minute
+USER_READ_QUOTA = 60
+USER_WRITE_QUOTA = 60
+PROJECT_READ_QUOTA = 300
+PROJECT_WRITE_QUOTA = 300
+
+# Google recommends keeping request payloads under 2 MB
+MAX_REQUEST_BYTES = 2_000_000
+MAX_REQUEST_CELLS = 50_000
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter.
+
+    Parameters
+    ----------
+    per_minute : float
+        Sustained number of tokens per minute.
+    burst : int, optional
+        Largest number of tokens that can be taken at once after a quiet period, by default 10
+    """
+
+    def __init__(self, per_minute, burst=10):
+        self._rate = per_minute / 60.0
+        self._capacity = max(1, burst)
+        self._tokens = float(self._capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+
+    def _try_take(self, tokens):
+        "Take tokens if available and return 0, otherwise return the seconds to wait"
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self._rate
+
+    def acquire(self, tokens=1):
+        "Block until tokens are available, then take them. Returns the time spent waiting."
+        waited = 0.0
+        wait = self._try_take(tokens)
+        while wait > 0:
+            time.sleep(wait)
+            waited += wait
+            wait = self._try_take(tokens)
+        return waited
+
+    async def acquire_async(self, tokens=1):
+        "Like acquire, but waits without blocking the event loop"
+        waited = 0.0
+        wait = self._try_take(tokens)
+        while wait > 0:
+            await asyncio.sleep(wait)
+            waited += wait
+            wait = self._try_take(tokens)
+        return waited
+
+
+_PROJECT_BUCKETS = {}
+_PROJECT_BUCKETS_LOCK = threading.Lock()
+
+
+def project_bucket(kind, per_minute):
+    "Token bucket shared by every executor in this process for a project-wide quota"
+    with _PROJECT_BUCKETS_LOCK:
+        if (kind, per_minute) not in _PROJECT_BUCKETS:
+            _PROJECT_BUCKETS[(kind, per_minute)] = TokenBucket(per_minute)
+        return _PROJECT_BUCKETS[(kind, per_minute)]
+
+
+class ExecutionReport:
+    """Responses, failed chunks and retry count for a possibly chunked request.
+
+    `unsent` holds the bodies that were never sent because an earlier chunk of an ordered
+    request failed. Send the failed body and then these, in order, to resume.
+    """
+
+    def __init__(self):
+        self.responses = []
+        self.failures = []
+        self.unsent = []
+        self.retries = 0
+
+    @property
+    def ok(self):
+        return len(self.failures) == 0 and len(self.unsent) == 0
+
+    def __repr__(self):
+        return f"ExecutionReport(responses={len(self.responses)}, failures={len(self.failures)}, unsent={len(self.unsent)}, retries={self.retries})"
+
+
+def _status(err):
+    try:
+        return int(err.resp.status)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _retry_after(err):
+    try:
+        return float(err.resp.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _count_retry(kind, status, delay, report=None, record=None):
+    "Record a retry in the report, the instrumentation record and any collectors"
+    if instrumentation.active():
+        instrumentation.emit("retry", {"kind": kind, "status": status, "seconds": delay})
+    if report is not None:
+        report.retries += 1
+    if record is not None:
+        record["retries"] = record.get("retries", 0) + 1
+
+
+def _payload_bytes(obj):
+    return len(json.dumps(obj, separators=(",", ":")))
+
+
+def _cell_count(values):
+    return sum(len(row) for row in values)
+
+
+_A1_PATTERN = re.compile(r"^(?:(.*)!)?([A-Z]+)(\d+):([A-Z]+)(\d+)$")
+
+
+def _split_value_range(entry, max_cells, max_bytes):
+    "Split a single {'range', 'values'} entry into row blocks that fit the limits"
+    values = entry["values"]
+    match = _A1_PATTERN.match(entry["range"])
+    if match is None or len(values) <= 1:
+        return [entry]
+    sheet, c0, r0, c1, _ = match.groups()
+    width = max(1, max(len(row) for row in values))
+    row_bytes = max(1, _payload_bytes(values) // len(values))
+    n_rows = max(1, min(max_cells // width, max_bytes // row_bytes))
+    prefix = f"{sheet}!" if sheet is not None else ""
+
+    entries = []
+    for start in range(0, len(values), n_rows):
+        block = values[start : start + n_rows]
+        first = int(r0) + start
+        entries.append(
+            {
+                "range": f"{prefix}{c0}{first}:{c1}{first + len(block) - 1}",
+                "values": block,
+            }
+        )
+    return entries
+
+
+def split_batch_update(body, max_cells=MAX_REQUEST_CELLS, max_bytes=MAX_REQUEST_BYTES):
+    """Split a values batchUpdate body into bodies under the cell and byte limits.
+
+    Returns
+    -------
+    list
+        List of request bodies with the same options as the original.
+    """
+    entries = []
+    for entry in body["data"]:
+        if _cell_count(entry["values"]) > max_cells or _payload_bytes(entry) > max_bytes:
+            entries.extend(_split_value_range(entry, max_cells, max_bytes))
+        else:
+            entries.append(entry)
+
+    options = {k: v for k, v in body.items() if k != "data"}
+    bodies = []
+    chunk, cells, size = [], 0, 0
+    for entry in entries:
+        entry_cells = _cell_count(entry["values"])
+        entry_bytes = _payload_bytes(entry)
+        if chunk and (cells + entry_cells > max_cells or size + entry_bytes > max_bytes):
+            bodies.append({**options, "data": chunk})
+            chunk, cells, size = [], 0, 0
+        chunk.append(entry)
+        cells += entry_cells
+        size += entry_bytes
+    if chunk:
+        bodies.append({**options, "data": chunk})
+    return bodies
+
+
+def split_append(body, max_cells=MAX_REQUEST_CELLS, max_bytes=MAX_REQUEST_BYTES):
+    """Split a values append body into bodies under the cell and byte limits, keeping row order.
+
+    Returns
+    -------
+    list
+        List of request bodies
+    """
+    values = body["values"]
+    if len(values) == 0:
+        return [body]
+    bodies = []
+    chunk, cells, size = [], 0, 0
+    for row in values:
+        row_bytes = _payload_bytes(row)
+        if chunk and (cells + len(row) > max_cells or size + row_bytes > max_bytes):
+            bodies.append({**body, "values": chunk})
+            chunk, cells, size = [], 0, 0
+        chunk.append(row)
+        cells += len(row)
+        size += row_bytes
+    bodies.append({**body, "values": chunk})
+    return bodies
+
+
+class RequestExecutor:
+    """Runs Sheets API requests with quota limiting, retries and request splitting.
+
+    Requests that fail with a 429 or 5xx status are retried with jittered exponential backoff.
+    Every request first takes a token from the per-user bucket of its kind and from the
+    project-wide bucket shared by all executors in the process.
+
+    Parameters
+    ----------
+    read_per_minute : float, optional
+        Per-user read quota, by default 60
+    write_per_minute : float, optional
+        Per-user write quota, by default 60
+    project_read_per_minute : float or None, optional
+        Per-project read quota, by default 300. None disables the project limit.
+    project_write_per_minute : float or None, optional
+        Per-project write quota, by default 300. None disables the project limit.
+    max_retries : int, optional
+        Retries after the first attempt, by default 5
+    base_delay : float, optional
+        Backoff delay in seconds before the first retry, by default 1
+    max_delay : float, optional
+        Largest backoff delay in seconds, by default 64
+    max_cells : int, optional
+        Most cells in one write request, by default 50,000
+    max_bytes : int, optional
+        Largest JSON payload of one write request, by default 2 MB
+    """
+
+    def __init__(
+        self,
+        read_per_minute=USER_READ_QUOTA,
+        write_per_minute=USER_WRITE_QUOTA,
+        project_read_per_minute=PROJECT_READ_QUOTA,
+        project_write_per_minute=PROJECT_WRITE_QUOTA,
+        max_retries=5,
+        base_delay=1.0,
+        max_delay=64.0,
+        max_cells=MAX_REQUEST_CELLS,
+        max_bytes=MAX_REQUEST_BYTES,
+    ):
+        self._buckets = {"read": [], "write": []}
+        for kind, user_rate, project_rate in (
+            ("read", read_per_minute, project_read_per_minute),
+            ("write", write_per_minute, project_write_per_minute),
+        ):
+            if user_rate is not None:
+                self._buckets[kind].append(TokenBucket(user_rate))
+            if project_rate is not None:
+                self._buckets[kind].append(project_bucket(kind, project_rate))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_cells = max_cells
+        self.max_bytes = max_bytes
+
+    def buckets(self, kind):
+        "Token buckets a request of this kind has to take from"
+        return self._buckets[kind]
+
+    def backoff(self, attempt, retry_after=None):
+        "Jittered exponential backoff delay in seconds before retry number attempt + 1"
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def retry_delay(self, attempt, status, retry_after=None, idempotent=True):
+        """Seconds to wait before retrying a failed request, or None if it should not be retried.
+
+        Parameters
+        ----------
+        attempt : int
+            Number of retries so far
+        status : int or None
+            HTTP status of the failure, or None if no response arrived, e.g. on a timeout.
+        retry_after : float or None, optional
+            Value of the response's retry-after header
+        idempotent : bool, optional
+            Whether sending the request twice is harmless. Without a response the request may
+            have been applied, so only idempotent requests are retried then. By default True.
+        """
+        if attempt >= self.max_retries:
+            return None
+        if status is None and not idempotent:
+            return None
+        if status is not None and status not in RETRY_STATUS:
+            return None
+        return self.backoff(attempt, retry_after)
+
+    def execute(self, make_request, kind="read", report=None, record=None):
+        """Run a single request, retrying on quota and server errors.
+
+        Parameters
+        ----------
+        make_request : callable
+            Function with no arguments returning an object with an `execute` method, e.g. an
+            unexecuted googleapiclient request.
+        kind : str, optional
+            "read" or "write", selecting which quota applies. By default "read".
+        report : ExecutionReport, optional
+            If given, the response or failure is recorded in the report.
+        record : dict, optional
+            Instrumentation record whose "retries" count is increased on every retry.
+
+        Returns
+        -------
+        response
+            Response of the request, or None if it failed.
+        """
+        attempt = 0
+        while True:
+            for bucket in self._buckets[kind]:
+                bucket.acquire()
+            try:
+                response = make_request().execute()
+            except HttpError as err:
+                delay = self.retry_delay(attempt, _status(err), _retry_after(err))
+                if delay is not None:
+                    _count_retry(kind, _status(err), delay, report, record)
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                if report is None:
+                    raise
+                report.failures.append(err)
+                return None
+            if report is not None:
+                report.responses.append(response)
+            return response
+
+    def execute_chunks(self, make_request, bodies, kind="write", ordered=False):
+        """Run one request per body in order, collecting failed chunks instead of raising.
+
+        Parameters
+        ----------
+        make_request : callable
+            Function taking a body and returning an unexecuted request.
+        bodies : list
+            Request bodies, e.g. from `split_batch_update` or `split_append`.
+        kind : str, optional
+            "read" or "write", by default "write"
+        ordered : bool, optional
+            If True, stop at the first failed chunk and leave the rest in the report's
+            `unsent`, for requests whose result depends on the order, like appends.
+            Otherwise every chunk is tried. By default False.
+
+        Returns
+        -------
+        ExecutionReport
+            Responses, failures as (body, error) tuples, unsent bodies and the number of
+            retries.
+        """
+        report = ExecutionReport()
+        for ii, body in enumerate(bodies):
+            n_failed = len(report.failures)
+            self.execute(lambda: make_request(body), kind=kind, report=report)
+            if len(report.failures) > n_failed:
+                report.failures[-1] = (body, report.failures[-1])
+                if ordered:
+                    report.unsent = list(bodies[ii + 1 :])
+                    break
+        return report
+
+    def split_batch_update(self, body):
+        return split_batch_update(body, self.max_cells, self.max_bytes)
+
+    def split_append(self, body):
+        return split_append(body, self.max_cells, self.max_bytes)
+
+
+_DEFAULT_EXECUTOR = None
+
+
+def default_executor():
+    "Executor used when none is passed, shared by the whole process"
+    global _DEFAULT_EXECUTOR
+    if _DEFAULT_EXECUTOR is None:
+        _DEFAULT_EXECUTOR = RequestExecutor()
+    return _DEFAULT_EXECUTOR
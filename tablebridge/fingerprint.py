@@ -0,0 +1,203 @@
+import json
+import time
+import numpy as np
+import pandas as pd
+
+from .comparison import DiffResult
+from .hashing import _column_hashes
+
+__all__ = ["RowFingerprints"]
+
+
+# Changes whenever the hashes change, so snapshots from another version are not compared
+HASH_VERSION = 2
+
+_ROW_MULTIPLIER = np.uint64(0x100000001B3)
+
+
+def hash_rows(df, data_columns):
+    """Hash the content of each row over the data columns.
+
+    Hashes depend on the values only, not on the column dtypes, so a column that switches
+    between int64 and object as NAs come and go keeps the hashes of its unchanged rows.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Dataframe to hash
+    data_columns : list
+        Columns included in the hash, in order.
+
+    Returns
+    -------
+    np.ndarray
+        uint64 hash per row
+    """
+    hashes = np.zeros(len(df), dtype=np.uint64)
+    for col in data_columns:
+        hashes = hashes * _ROW_MULTIPLIER ^ _column_hashes(df[col])
+    return hashes
+
+
+class RowFingerprints:
+    """Per-row content hashes of an annotation table, keyed by id.
+
+    Fingerprints can be saved between syncs and compared against a fresh table, so that only
+    rows whose hash changed need to be looked at in full.
+
+    Parameters
+    ----------
+    ids : array-like
+        Unique row ids
+    hashes : array-like
+        uint64 content hash for each id
+    id_column : str
+        Name of the id column the ids came from
+    data_columns : list
+        Columns that were hashed, in order.
+    created : float, optional
+        Unix timestamp of the snapshot. Defaults to now.
+    hash_version : int, optional
+        Version of `hash_rows` the hashes came from, by default the current one.
+    """
+
+    def __init__(
+        self, ids, hashes, id_column, data_columns, created=None, hash_version=HASH_VERSION
+    ):
+        self._ids = np.asarray(ids)
+        self._hashes = np.asarray(hashes, dtype=np.uint64)
+        if len(self._ids) != len(self._hashes):
+            raise ValueError("ids and hashes must have the same length")
+        self._id_column = id_column
+        self._data_columns = list(data_columns)
+        if created is None:
+            created = time.time()
+        self._created = created
+        self._hash_version = hash_version
+
+    @classmethod
+    def from_dataframe(cls, df, id_column, data_columns=None):
+        """Build fingerprints from a dataframe.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Annotation table with a unique id column.
+        id_column : str
+            Name of the id column.
+        data_columns : list, optional
+            Columns to hash. By default, all columns other than the id column.
+
+        Returns
+        -------
+        RowFingerprints
+        """
+        if data_columns is None:
+            data_columns = [c for c in df.columns if c != id_column]
+        if len(data_columns) == 0:
+            raise ValueError(
+                "DataFrames must have at least one data column beyond the index"
+            )
+        ids = df[id_column]
+        if not ids.is_unique:
+            raise ValueError(f"Values in {id_column} must be unique")
+        return cls(ids.to_numpy(), hash_rows(df, data_columns), id_column, data_columns)
+
+    @property
+    def ids(self):
+        return self._ids
+
+    @property
+    def hashes(self):
+        return self._hashes
+
+    @property
+    def id_column(self):
+        return self._id_column
+
+    @property
+    def data_columns(self):
+        return self._data_columns
+
+    @property
+    def created(self):
+        return self._created
+
+    @property
+    def hash_version(self):
+        return self._hash_version
+
+    def __len__(self):
+        return len(self._ids)
+
+    def compare(self, previous, df=None):
+        """Classify rows relative to an earlier snapshot using only the hashes.
+
+        Parameters
+        ----------
+        previous : RowFingerprints
+            Earlier snapshot of the same table.
+        df : pd.DataFrame, optional
+            Dataframe these fingerprints were built from. If given, new and changed rows can be
+            selected from the result.
+
+        Returns
+        -------
+        DiffResult
+            Ids of new, removed, changed and unchanged rows.
+        """
+        if previous.data_columns != self.data_columns:
+            raise ValueError("Fingerprints were computed over different data columns")
+        if previous.hash_version != self.hash_version:
+            raise ValueError(
+                "Fingerprints were hashed by different versions, rebuild the earlier snapshot"
+            )
+
+        prev_index = pd.Index(previous.ids)
+        prev_pos = prev_index.get_indexer(self._ids)
+        is_new = prev_pos == -1
+        in_common = ~is_new
+        changed = np.zeros(len(self._ids), dtype=bool)
+        changed[in_common] = self._hashes[in_common] != previous.hashes[prev_pos[in_common]]
+
+        is_removed = ~prev_index.isin(self._ids)
+        return DiffResult(
+            self._id_column,
+            new_ids=self._ids[is_new],
+            removed_ids=previous.ids[is_removed],
+            changed_ids=self._ids[changed],
+            unchanged_ids=self._ids[in_common & ~changed],
+            new_df=df,
+        )
+
+    def save(self, filename):
+        """Save fingerprints to a numpy .npz file.
+
+        Ids keep their dtype, so integer ids still match integer ids after loading. Object ids
+        that are all strings are stored as text, other object ids are pickled.
+        """
+        ids = self._ids
+        if ids.dtype == object and pd.api.types.infer_dtype(ids, skipna=False) == "string":
+            ids = ids.astype(str)
+        meta = {
+            "id_column": self._id_column,
+            "data_columns": self._data_columns,
+            "created": self._created,
+            "hash_version": self._hash_version,
+        }
+        with open(filename, "wb") as f:
+            np.savez(f, ids=ids, hashes=self._hashes, meta=np.array(json.dumps(meta)))
+
+    @classmethod
+    def load(cls, filename):
+        "Load fingerprints saved with `save`. Only load files you wrote, as ids may be pickled."
+        with np.load(filename, allow_pickle=True) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(
+                data["ids"],
+                data["hashes"],
+                meta["id_column"],
+                meta["data_columns"],
+                created=meta["created"],
+                hash_version=meta.get("hash_version", 1),
+            )
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from .points import PointDtype
+from .validation import is_listlike
+
+# Mixed into hashes so that e.g. 1, "1" and [1] hash differently, and NA hashes to a constant
+_NA_HASH = np.uint64(0x9E3779B97F4A7C15)
+_FLOAT_SALT = np.uint64(0x5851F42D4C957F2D)
+_UINT_SALT = np.uint64(0xD6E8FEB86659FD93)
+_TEXT_SALT = np.uint64(0x14057B7EF767814F)
+_LIST_SALT = np.uint64(0xBF58476D1CE4E5B9)
+
+_NUMBER_TYPES = ("integer", "floating", "mixed-integer-float", "boolean", "decimal")
+
+
+def _number_hashes(values):
+    "Hashes of numbers in which equal values hash the same whatever their dtype, e.g. 1 and 1.0"
+    values = np.asarray(values)
+    if values.dtype.kind == "b":
+        values = values.astype(np.int64)
+    if values.dtype.kind == "i":
+        return pd.util.hash_array(values.astype(np.int64, copy=False))
+
+    out = np.empty(len(values), dtype=np.uint64)
+    if values.dtype.kind == "u":
+        small = values <= np.iinfo(np.int64).max
+        out[small] = pd.util.hash_array(values[small].astype(np.int64))
+        out[~small] = pd.util.hash_array(values[~small]) ^ _UINT_SALT
+        return out
+
+    values = values.astype(np.float64)
+    with np.errstate(invalid="ignore"):
+        integral = (
+            np.isfinite(values) & (values == np.round(values)) & (np.abs(values) < 2**63)
+        )
+    out[integral] = pd.util.hash_array(values[integral].astype(np.int64))
+    out[~integral] = pd.util.hash_array(values[~integral]) ^ _FLOAT_SALT
+    return out
+
+
+def _text_hashes(values, salt=_TEXT_SALT):
+    return pd.util.hash_array(np.asarray(values, dtype=object)) ^ salt
+
+
+def _item_text(x):
+    if isinstance(x, (bool, np.bool_)):
+        return str(int(x))
+    if isinstance(x, (int, np.integer)):
+        return str(x)
+    if isinstance(x, (float, np.floating)) and np.isfinite(x) and x == int(x):
+        return str(int(x))
+    return str(x)
+
+
+def _list_text(x):
+    "Text of a list-valued cell, formatted like `PointArray.to_strings` for integer points"
+    return ", ".join(_item_text(i) for i in x)
+
+
+def _object_hashes(values):
+    "Hashes of present values in an object array, which may mix numbers, text and lists"
+    inferred = pd.api.types.infer_dtype(values, skipna=False)
+    if inferred == "string":
+        return _text_hashes(values)
+    if inferred in _NUMBER_TYPES:
+        return _number_hashes(np.array(values.tolist()))
+
+    is_number = np.fromiter(
+        (
+            isinstance(x, (int, float, np.integer, np.floating, np.bool_))
+            for x in values
+        ),
+        dtype=bool,
+        count=len(values),
+    )
+    is_list = np.fromiter(map(is_listlike, values), dtype=bool, count=len(values))
+    is_text = ~(is_number | is_list)
+    out = np.empty(len(values), dtype=np.uint64)
+    if np.any(is_number):
+        out[is_number] = _number_hashes(np.array(values[is_number].tolist()))
+    if np.any(is_list):
+        out[is_list] = _text_hashes([_list_text(x) for x in values[is_list]], _LIST_SALT)
+    if np.any(is_text):
+        out[is_text] = _text_hashes([str(x) for x in values[is_text]])
+    return out
+
+
+def _column_hashes(col):
+    """Hash of each value of a column, consistent with `column_differs`.
+
+    Values that compare equal hash the same regardless of dtype. For example, an int64 column
+    and a float or object column with NA give the same hashes for the same numbers.
+    """
+    valid = ~col.isna().to_numpy()
+    out = np.full(len(col), _NA_HASH, dtype=np.uint64)
+    if not np.any(valid):
+        return out
+    if isinstance(col.dtype, PointDtype):
+        out[valid] = _text_hashes(col.array.to_strings()[valid], _LIST_SALT)
+        return out
+    values = col[valid].to_numpy()
+    if values.dtype.kind in "biuf":
+        out[valid] = _number_hashes(values)
+    else:
+        out[valid] = _object_hashes(values.astype(object))
+    return out
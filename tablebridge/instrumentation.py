@@ -0,0 +1,168 @@
+import time
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+__all__ = ["add_collector", "remove_collector", "collecting", "MetricsCollector"]
+
+_collectors = []
+_collectors_lock = threading.Lock()
+
+
+def add_collector(collector):
+    """Start sending events to a collector.
+
+    Parameters
+    ----------
+    collector : callable
+        Called as collector(event, fields) for every event, where event is "api_call",
+        "retry" or "stage" and fields is a dict. Called from whichever thread produced the
+        event, so it must be thread-safe.
+    """
+    with _collectors_lock:
+        _collectors.append(collector)
+
+
+def remove_collector(collector):
+    with _collectors_lock:
+        if collector in _collectors:
+            _collectors.remove(collector)
+
+
+@contextmanager
+def collecting(collector=None):
+    """Attach a collector for the duration of a with block.
+
+    Parameters
+    ----------
+    collector : callable, optional
+        Collector to attach, by default a new `MetricsCollector`
+
+    Yields
+    ------
+    collector
+    """
+    if collector is None:
+        collector = MetricsCollector()
+    add_collector(collector)
+    try:
+        yield collector
+    finally:
+        remove_collector(collector)
+
+
+def active():
+    return len(_collectors) > 0
+
+
+def emit(event, fields):
+    for collector in tuple(_collectors):
+        collector(event, fields)
+
+
+class _Timer:
+    __slots__ = ("event", "fields", "t0")
+
+    def __init__(self, event, fields):
+        self.event = event
+        self.fields = fields
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self.fields
+
+    def __exit__(self, exc_type, exc, tb):
+        self.fields["seconds"] = time.perf_counter() - self.t0
+        self.fields["ok"] = exc_type is None and self.fields.get("ok", True)
+        emit(self.event, self.fields)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(event, **fields):
+    """Time a with block and emit an event with its duration.
+
+    The block gets the event's field dict to add to, or None when no collector is attached,
+    in which case nothing is measured. Sites should skip any work done only for the record.
+    """
+    if not _collectors:
+        return _NULL_TIMER
+    return _Timer(event, fields)
+
+
+class MetricsCollector:
+    """Collector that keeps every event and summarizes them by API method or stage name.
+
+    Attach it with `collecting` or `add_collector`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.events = []
+
+    def __call__(self, event, fields):
+        with self._lock:
+            self.events.append((event, dict(fields)))
+
+    def clear(self):
+        with self._lock:
+            self.events = []
+
+    def summary(self):
+        """Aggregate statistics per API method and per stage.
+
+        Returns
+        -------
+        dict
+            Keyed by "api_call:<method>" or "stage:<name>", with count, errors, total, mean,
+            p50, p95 and max seconds, summed bytes, cells, rows and retries, and rows per
+            second. Every retry is also counted under "retry", with the backoff delay as its
+            seconds.
+        """
+        with self._lock:
+            events = list(self.events)
+
+        groups = {}
+        for event, fields in events:
+            if event == "api_call":
+                key = f"api_call:{fields.get('method')}"
+            elif event == "stage":
+                key = f"stage:{fields.get('name')}"
+            else:
+                key = event
+            groups.setdefault(key, []).append(fields)
+
+        out = {}
+        for key, records in groups.items():
+            seconds = np.array([r.get("seconds", 0.0) for r in records])
+            stats = {
+                "count": len(records),
+                "errors": sum(not r.get("ok", True) for r in records),
+                "total_seconds": float(seconds.sum()),
+                "mean_seconds": float(seconds.mean()),
+                "p50_seconds": float(np.percentile(seconds, 50)),
+                "p95_seconds": float(np.percentile(seconds, 95)),
+                "max_seconds": float(seconds.max()),
+            }
+            for field in ("request_bytes", "response_bytes", "cells", "rows", "retries"):
+                stats[field] = sum(r.get(field, 0) for r in records)
+            if key == "retry":
+                stats["retries"] = len(records)
+            stats["rows_per_second"] = (
+                stats["rows"] / stats["total_seconds"] if stats["total_seconds"] > 0 else None
+            )
+            out[key] = stats
+        return out
@@ -0,0 +1,98 @@
+import numpy as np
+
+from .addressing import a1_ranges, column_numbers
+
+__all__ = ["plan_updates"]
+
+
+def _last_unique_cells(rows, cols):
+    "Positions of the last value written to each distinct (row, column) cell"
+    keys = np.stack((rows, cols), axis=1)
+    _, first_from_end = np.unique(keys[::-1], axis=0, return_index=True)
+    return np.sort(len(rows) - 1 - first_from_end)
+
+
+def _split_runs(keys, positions, max_gap):
+    "True where a new run starts, i.e. the key changes or positions jump by more than max_gap + 1"
+    starts = np.ones(len(positions), dtype=bool)
+    starts[1:] = (keys[1:] != keys[:-1]) | (np.diff(positions) > max_gap + 1)
+    return starts
+
+
+def plan_updates(rows, columns, values, sheet_name=None, max_gap=0):
+    """Group cell updates into as few rectangular ranges as possible.
+
+    Cells are first joined into vertical runs within each column, then runs that cover the
+    same rows in neighboring columns are joined into rectangles. Single-row updates across
+    columns and dense blocks both end up as one range each.
+
+    Parameters
+    ----------
+    rows : array-like
+        Sheet row number of each cell
+    columns : array-like
+        Column letter of each cell
+    values : array-like
+        Value of each cell. If a cell appears more than once, the last value is used.
+    sheet_name : str or None, optional
+        Sheet name to use in the ranges, by default None
+    max_gap : int, optional
+        Largest number of consecutive unchanged rows or columns that can be spanned inside a
+        range. Spanned cells are sent as null values, which the Sheets API skips, so they are
+        left as they are. By default 0, which never spans a gap.
+
+    Returns
+    -------
+    list
+        List of {"range": ..., "values": ...} dicts for a values batchUpdate request.
+    """
+    rows = np.atleast_1d(np.asarray(rows, dtype=np.int64))
+    letters = np.atleast_1d(np.asarray(columns, dtype=str))
+    values = np.atleast_1d(np.asarray(values, dtype=object))
+    if len(rows) == 0:
+        return []
+
+    cols = column_numbers(letters)
+
+    keep = _last_unique_cells(rows, cols)
+    rows, cols, values = rows[keep], cols[keep], values[keep]
+
+    # Vertical runs within each column
+    order = np.lexsort((rows, cols))
+    rows, cols, values = rows[order], cols[order], values[order]
+    run_starts = _split_runs(cols, rows, max_gap)
+    cell_run = np.cumsum(run_starts) - 1
+    run_first = np.flatnonzero(run_starts)
+    run_col = cols[run_first]
+    run_r0 = rows[run_first]
+    run_r1 = np.maximum.reduceat(rows, run_first)
+
+    # Runs with identical row spans in neighboring columns become one rectangle
+    run_order = np.lexsort((run_col, run_r1, run_r0))
+    span_key = run_r0[run_order] * (run_r1.max() + 1) + run_r1[run_order]
+    rect_starts = _split_runs(span_key, run_col[run_order], max_gap)
+    run_rect = np.empty(len(run_order), dtype=np.int64)
+    run_rect[run_order] = np.cumsum(rect_starts) - 1
+
+    cell_rect = run_rect[cell_run]
+    cell_order = np.argsort(cell_rect, kind="stable")
+    bounds = np.flatnonzero(np.diff(cell_rect[cell_order])) + 1
+
+    rect_first = np.concatenate([[0], bounds])
+    rect_end = np.append(bounds, len(cell_order))
+    r_sorted, c_sorted = rows[cell_order], cols[cell_order]
+    r0 = np.minimum.reduceat(r_sorted, rect_first)
+    r1 = np.maximum.reduceat(r_sorted, rect_first)
+    c0 = np.minimum.reduceat(c_sorted, rect_first)
+    c1 = np.maximum.reduceat(c_sorted, rect_first)
+    ranges = a1_ranges(r0, c0, r1, c1, sheet_name).tolist()
+
+    # Single cells, the common case for sparse updates, skip building a grid
+    first_values = values[cell_order[rect_first]].tolist()
+    data = [{"range": rng, "values": [[v]]} for rng, v in zip(ranges, first_values)]
+    for ii in np.flatnonzero(rect_end - rect_first > 1).tolist():
+        cells = cell_order[rect_first[ii] : rect_end[ii]]
+        grid = np.full((r1[ii] - r0[ii] + 1, c1[ii] - c0[ii] + 1), None, dtype=object)
+        grid[rows[cells] - r0[ii], cols[cells] - c0[ii]] = values[cells]
+        data[ii]["values"] = grid.tolist()
+    return data
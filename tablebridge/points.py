@@ -0,0 +1,243 @@
+import re
+import numbers
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import (
+    ExtensionArray,
+    ExtensionDtype,
+    register_extension_dtype,
+)
+from pandas.api.indexers import check_array_indexer
+
+__all__ = ["PointDtype", "PointArray", "parse_points"]
+
+POINT_PATTERN = re.compile(r"(\d+)[,\s]*(\d+)[,\s]*(\d+)")
+
+
+@register_extension_dtype
+class PointDtype(ExtensionDtype):
+    "Dtype for columns of 3d integer points"
+
+    name = "point"
+    type = list
+    kind = "O"
+    na_value = pd.NA
+
+    @classmethod
+    def construct_array_type(cls):
+        return PointArray
+
+
+def _is_missing(x):
+    if x is None or x is pd.NA:
+        return True
+    if isinstance(x, float):
+        return np.isnan(x)
+    return False
+
+
+class PointArray(ExtensionArray):
+    """Column of 3d integer points, stored as a contiguous (N, 3) int64 array with a missing-value mask.
+
+    Individual elements are returned as lists of three ints, like `validation.process_point`.
+
+    Parameters
+    ----------
+    coords : array-like
+        (N, 3) integer coordinates. Values at missing positions are ignored.
+    mask : array-like, optional
+        Boolean array, True where the point is missing. By default no points are missing.
+    copy : bool, optional
+        If True, copy the input arrays, by default False
+    """
+
+    def __init__(self, coords, mask=None, copy=False):
+        # np.array(copy=False) raises under numpy 2 whenever a cast or copy is needed
+        convert = np.array if copy else np.asarray
+        coords = convert(coords, dtype=np.int64).reshape(-1, 3)
+        if mask is None:
+            mask = np.zeros(len(coords), dtype=bool)
+        else:
+            mask = convert(mask, dtype=bool)
+        if len(mask) != len(coords):
+            raise ValueError("coords and mask must have the same length")
+        self._coords = coords
+        self._mask = mask
+
+    @classmethod
+    def _from_sequence(cls, scalars, *, dtype=None, copy=False):
+        if isinstance(scalars, PointArray):
+            return scalars.copy() if copy else scalars
+        values = list(scalars)
+        mask = np.fromiter(map(_is_missing, values), dtype=bool, count=len(values))
+        coords = np.zeros((len(values), 3), dtype=np.int64)
+        if not np.all(mask):
+            present = [list(x) for x, m in zip(values, mask) if not m]
+            coords[~mask] = np.array(present, dtype=np.int64).reshape(-1, 3)
+        return cls(coords, mask)
+
+    @classmethod
+    def _from_factorized(cls, values, original):
+        return parse_points(values)
+
+    @property
+    def dtype(self):
+        return PointDtype()
+
+    @property
+    def coords(self):
+        "(N, 3) int64 coordinates. Rows where the point is missing are meaningless."
+        return self._coords
+
+    @property
+    def valid(self):
+        "Boolean array, True where the point is present"
+        return ~self._mask
+
+    @property
+    def nbytes(self):
+        return self._coords.nbytes + self._mask.nbytes
+
+    def __len__(self):
+        return len(self._coords)
+
+    def __getitem__(self, item):
+        if isinstance(item, numbers.Integral):
+            if self._mask[item]:
+                return pd.NA
+            return self._coords[item].tolist()
+        item = check_array_indexer(self, item)
+        return type(self)(self._coords[item], self._mask[item])
+
+    def __setitem__(self, key, value):
+        key = check_array_indexer(self, key)
+        if _is_missing(value):
+            self._mask[key] = True
+            return
+        if not isinstance(value, PointArray):
+            if np.ndim(value) == 1 and len(value) == 3 and not isinstance(value[0], list):
+                value = type(self)([value])
+            else:
+                value = type(self)._from_sequence(value)
+        self._coords[key] = value._coords
+        self._mask[key] = value._mask
+
+    def __iter__(self):
+        for ii in range(len(self)):
+            yield self[ii]
+
+    def __array__(self, dtype=None, copy=None):
+        out = np.empty(len(self), dtype=object)
+        out[:] = pd.NA
+        valid = ~self._mask
+        out[valid] = np.fromiter(
+            iter(self._coords[valid].tolist()), dtype=object, count=np.sum(valid)
+        )
+        return out
+
+    def __eq__(self, other):
+        if isinstance(other, (pd.Series, pd.Index, pd.DataFrame)):
+            return NotImplemented
+        if not isinstance(other, PointArray):
+            other = type(self)._from_sequence(
+                [other] * len(self) if np.ndim(other) == 1 else other
+            )
+        same = np.all(self._coords == other._coords, axis=1)
+        return same & ~self._mask & ~other._mask
+
+    def isna(self):
+        return self._mask.copy()
+
+    def take(self, indices, allow_fill=False, fill_value=None):
+        indices = np.asarray(indices, dtype=np.intp)
+        if allow_fill:
+            if np.any(indices < -1):
+                raise ValueError("Invalid value in 'indices'. Must be >= -1")
+            fill = indices == -1
+            if len(self) == 0:
+                if not np.all(fill):
+                    raise IndexError("cannot do a non-empty take from an empty array")
+                return type(self)(np.zeros((len(indices), 3)), np.ones(len(indices), bool))
+            safe = np.where(fill, 0, indices)
+            result = type(self)(self._coords[safe], self._mask[safe] | fill)
+            if fill_value is not None and not _is_missing(fill_value):
+                result[fill] = fill_value
+            return result
+        return type(self)(self._coords[indices], self._mask[indices])
+
+    def copy(self):
+        return type(self)(self._coords, self._mask, copy=True)
+
+    @classmethod
+    def _concat_same_type(cls, to_concat):
+        return cls(
+            np.concatenate([x._coords for x in to_concat]),
+            np.concatenate([x._mask for x in to_concat]),
+        )
+
+    def _values_for_factorize(self):
+        values = self.to_strings(sep=",")
+        values[self._mask] = None
+        return values, None
+
+    def unique(self):
+        values, _ = self._values_for_factorize()
+        codes, _ = pd.factorize(values, use_na_sentinel=False)
+        _, first = np.unique(codes, return_index=True)
+        return self.take(np.sort(first))
+
+    def differs(self, other):
+        """Vectorized comparison with another point array of the same length.
+
+        Both-missing counts as equal, exactly one missing counts as different.
+        """
+        same_coords = np.all(self._coords == other._coords, axis=1)
+        both_valid = ~self._mask & ~other._mask
+        return (self._mask != other._mask) | (both_valid & ~same_coords)
+
+    def to_strings(self, sep=", "):
+        """Format every point as a string, with pd.NA for missing points.
+
+        Returns
+        -------
+        np.ndarray
+            Object array of strings like "1, 2, 3"
+        """
+        out = join_text_columns(self._coords.astype(str), sep)
+        out[self._mask] = pd.NA
+        return out
+
+
+def join_text_columns(text, sep=", "):
+    "Join the columns of a 2d string or object array of strings row by row, returning an object array"
+    if text.shape[1] == 0:
+        return np.full(len(text), "", dtype=object)
+    add = np.add if text.dtype == object else np.char.add
+    out = text[:, 0]
+    for ii in range(1, text.shape[1]):
+        out = add(add(out, sep), text[:, ii])
+    return out.astype(object)
+
+
+def parse_points(col):
+    """Parse strings with three integers into a PointArray.
+
+    Strings are searched with the same pattern as `validation.process_point`.
+    Empty, missing or non-matching cells become missing points.
+
+    Parameters
+    ----------
+    col : array-like
+        Strings or None
+
+    Returns
+    -------
+    PointArray
+    """
+    s = pd.Series(np.asarray(col, dtype=object), dtype=object)
+    parts = s.str.extract(POINT_PATTERN)
+    mask = parts.isna().any(axis=1).to_numpy()
+    coords = np.zeros((len(s), 3), dtype=np.int64)
+    if not np.all(mask):
+        coords[~mask] = parts[~mask].to_numpy(dtype=object).astype(np.int64)
+    return PointArray(coords, mask)
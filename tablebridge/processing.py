@@ -1,30 +1,43 @@
 import re
+import abc
 import pandas as pd
 import numpy as np
-from .utils import number_to_column, column_to_number
-from .auth import get_credentials, HttpError
-from .validation import no_validation, process_column
-from googleapiclient.discovery import build
+from .utils import number_to_column, column_to_number, set_range
+from .planner import plan_updates
+from .auth import default_pool, HttpError
+from .executor import default_executor, _payload_bytes, _cell_count
+from . import instrumentation
+from .cache import SheetCache
+from .validation import (
+    no_validation,
+    column_validator,
+    serialize_column,
+    serialize_frame,
+    _cast_column,
+    _object_array,
+)
+from pandas.api.extensions import ExtensionArray
 
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]  # read+write scope
 
-__all__ = ["SheetProcessor"]
+__all__ = ["SheetProcessor", "batch_update_data"]
 
 
-class SheetProcessor:
+class _BaseSheetProcessor(abc.ABC):
+    "Sheet layout, processing and caching shared by the blocking and asyncio processors"
+
     def __init__(
         self,
         sheet_id,
-        token_file,
         column_names,
         first_row=0,
         first_column="A",
         sheet_name=None,
         validation_map=None,
-        secrets_file=None,
         api_key=None,
+        cache=None,
+        cache_key=None,
     ):
-        self._service = sheet_service(token_file, secrets_file)
         self._key = api_key
         self._sheet_name = sheet_name
         self._sheet_id = sheet_id
@@ -41,11 +54,22 @@ class SheetProcessor:
         self._first_row = first_row
         self._first_column = first_column
         self._data = None
+        self._n_raw_rows = 0
+        self._raw_tail = []
+        self._cache = cache
+        self._cache_key = cache_key
+        if cache is not None and cache_key is None:
+            # Validators without a stable name fail here rather than on first use
+            self._cache_key = self.cache_key
 
     @property
     def sheet_name(self):
         return self._sheet_name
 
+    @property
+    def sheet_id(self):
+        return self._sheet_id
+
     @property
     def column_names(self):
         return self._column_names
@@ -65,27 +89,132 @@ class SheetProcessor:
         return self._first_row
 
     @property
-    def data(self):
-        if self._data is None:
-            self.update_data()
+    def cache_key(self):
+        "Key of the cache entry, as passed at construction or from `SheetCache.key`"
+        if self._cache_key is not None:
+            return self._cache_key
+        return SheetCache.key(
+            self._sheet_id, self.sheet_range, self._column_names, self._validation_map
+        )
+
+    def _load_cached(self):
+        if self._cache is None:
+            return False
+        cached = self._cache.load(self.cache_key)
+        if cached is None:
+            return False
+        self._data, meta = cached
+        self._n_raw_rows = meta.get("n_raw_rows", 0)
+        self._raw_tail = meta.get("raw_tail", [])
+        return True
+
+    def _save_cached(self):
+        if self._cache is not None:
+            self._cache.save(
+                self.cache_key,
+                self._data,
+                n_raw_rows=self._n_raw_rows,
+                raw_tail=self._raw_tail,
+            )
+
+    def invalidate_cache(self):
+        "Remove this sheet's entry from the local cache, if one is used"
+        if self._cache is not None:
+            self._cache.invalidate(self.cache_key)
+
+    def _after_write(self):
+        "Drop what our own writes made stale, so the next update_data does a full read"
+        # The overlap check only sees the last rows, so a write above them would go unnoticed
+        self._n_raw_rows = 0
+        self._raw_tail = []
+        self.invalidate_cache()
+
+    def _ingest_raw(self, raw, overlap=5):
+        values = raw.get("values", [])
+        self._n_raw_rows = len(values)
+        self._raw_tail = _last_rows(values, overlap)
+        self._set_data(self._process_raw(raw))
+        self._save_cached()
         return self._data.copy()
 
-    def update_data(self):
-        df = self._get_data()
+    def _set_data(self, df):
         row_index = self.row_mapping(df.index.values)
         df.index = pd.Index(row_index, name="table_row", dtype=int)
         self._data = df
-        return self.data
+        return self._data.copy()
 
-    def row_mapping(self, row_inds):
-        return np.array(row_inds) + self.row_offset
+    def _process_raw(self, data):
+        if data is None:
+            return process_records([], self.column_names, self._validation_map)
+        else:
+            return process_records(
+                data.get("values", []), self.column_names, self._validation_map
+            )
 
-    def _get_data(self):
+    def _restore_dtypes(self, df):
+        "Cast declared dtypes again, e.g. categoricals with different categories concatenate to object"
+        for column in self._column_names:
+            dtype = getattr(self._validation_map[column], "dtype", None)
+            if dtype is not None and df[column].dtype != dtype:
+                df[column] = _cast_column(df[column].to_numpy(), dtype)
+        return df
+
+    def _can_update_tail(self, incremental):
+        return incremental and self._data is not None and self._n_raw_rows > 0
+
+    def _tail_range(self, overlap):
+        "Number of known rows to check again and the range to fetch for an incremental update"
+        n_check = min(overlap, len(self._raw_tail))
         last_column = self.column_mapping[self.column_names[-1]]
-        return self._get_data_range(
-            (self._first_row, None), (self._first_column, last_column)
+        first_fetched = self._first_row + self._n_raw_rows - n_check
+        return n_check, set_range(
+            (first_fetched, None), (self._first_column, last_column), self.sheet_name
         )
 
+    def _apply_tail(self, raw, n_check, overlap):
+        "Append rows past the known end of the sheet. Returns False if a full reload is needed."
+        if raw is None or n_check == 0:
+            return False
+        values = raw.get("values", [])
+        if values[:n_check] != self._raw_tail[-n_check:]:
+            return False
+
+        new_values = values[n_check:]
+        if len(new_values) > 0:
+            df_new = process_records(new_values, self.column_names, self._validation_map)
+            df_new.index = pd.Index(
+                np.arange(len(df_new)) + self._first_row + self._n_raw_rows,
+                name="table_row",
+                dtype=int,
+            )
+            self._data = self._restore_dtypes(pd.concat([self._data, df_new]))
+        self._n_raw_rows += len(new_values)
+        self._raw_tail = _last_rows(self._raw_tail + new_values, overlap)
+        self._save_cached()
+        return True
+
+    @abc.abstractmethod
+    def _current_data(self):
+        "The processor's data, loading it first if the processor can"
+
+    @property
+    def data(self):
+        "Copy of the sheet data, indexed by table_row"
+        return self._current_data().copy()
+
+    @property
+    def data_view(self):
+        """Sheet data without copying the values.
+
+        This is a shallow copy: adding or replacing columns leaves the processor's data alone,
+        but editing values in place changes it, so treat it as read-only. With pandas
+        copy-on-write enabled, edits are isolated too.
+        """
+        return self._current_data().copy(deep=False)
+
+    def row_mapping(self, row_inds):
+        return np.array(row_inds) + self.row_offset
+
     @property
     def sheet_range(self):
         last_column = self.column_mapping[self.column_names[-1]]
@@ -93,127 +222,370 @@ class SheetProcessor:
             (self._first_row, None), (self._first_column, last_column), self.sheet_name
         )
 
+    def _series_cells(self, s, column_name=None):
+        if column_name is None:
+            column_name = s.name
+        rows = s.index.values
+        columns = [self.column_mapping[column_name]] * len(rows)
+        return rows, columns, s.values
+
+
+def _last_rows(values, n):
+    return values[max(0, len(values) - n) :] if n > 0 else []
+
+
+class SheetProcessor(_BaseSheetProcessor):
+    def __init__(
+        self,
+        sheet_id,
+        token_file,
+        column_names,
+        first_row=0,
+        first_column="A",
+        sheet_name=None,
+        validation_map=None,
+        secrets_file=None,
+        api_key=None,
+        executor=None,
+        service=None,
+        cache=None,
+        cache_key=None,
+    ):
+        super().__init__(
+            sheet_id,
+            column_names,
+            first_row=first_row,
+            first_column=first_column,
+            sheet_name=sheet_name,
+            validation_map=validation_map,
+            api_key=api_key,
+            cache=cache,
+            cache_key=cache_key,
+        )
+        self._token_file = token_file
+        self._secrets_file = secrets_file
+        self._service = service
+        if service is None:
+            # Authenticate up front so missing credentials fail at construction
+            sheet_service(token_file, secrets_file)
+        if executor is None:
+            executor = default_executor()
+        self._executor = executor
+
+    @property
+    def service(self):
+        "Service passed at construction, or the calling thread's service from the shared pool"
+        if self._service is not None:
+            return self._service
+        return sheet_service(self._token_file, self._secrets_file)
+
+    @property
+    def executor(self):
+        return self._executor
+
+    def _current_data(self):
+        if self._data is None and not self._load_cached():
+            self.update_data()
+        return self._data
+
+    def update_data(self, incremental=False, overlap=5):
+        """Download the sheet data and process it.
+
+        Parameters
+        ----------
+        incremental : bool, optional
+            If True and data has already been loaded, only fetch rows past the last known row
+            plus an overlap window. If the overlap rows no longer match what was previously
+            downloaded, fall back to a full reload. The first update after a write through
+            this processor is always a full reload. By default False.
+        overlap : int, optional
+            Number of already-loaded rows to download again and check in incremental mode,
+            by default 5
+
+        Returns
+        -------
+        pd.DataFrame
+            Sheet data indexed by table_row
+
+        Raises
+        ------
+        HttpError
+            If the read still fails after the executor's retries. The data already loaded is
+            kept.
+        """
+        if self._can_update_tail(incremental):
+            n_check, tail_range = self._tail_range(overlap)
+            raw = self._get_raw(tail_range)
+            if self._apply_tail(raw, n_check, overlap):
+                return self.data
+        return self._ingest_raw(self._get_raw(self.sheet_range), overlap)
+
+    def _get_raw(self, range_str):
+        return get_sheet_raw(
+            self.service,
+            self._sheet_id,
+            range=range_str,
+            key=self._key,
+            executor=self._executor,
+        )
+
+    def _get_data(self):
+        last_column = self.column_mapping[self.column_names[-1]]
+        return self._get_data_range(
+            (self._first_row, None), (self._first_column, last_column)
+        )
+
     def _get_data_range_raw(self, rows, columns, sheet_name=None):
         if sheet_name is None:
             sheet_name = self.sheet_name
 
         range_str = set_range(rows, columns, sheet_name)
-        return get_sheet_raw(
-            self._service, self._sheet_id, range=range_str, key=self._key
-        )
+        return self._get_raw(range_str)
 
     def _get_data_range(self, rows, columns, sheet_name=None):
         data = self._get_data_range_raw(rows, columns, sheet_name)
-        if data is None:
-            return process_records([], self.column_names, self._validation_map)
-        else:
-            return process_records(
-                data.get("values", []), self.column_names, self._validation_map
-            )
-
-    def set_values(self, rows, columns, values):
-        values = process_column(values)
+        return self._process_raw(data)
+
+    def set_values(self, rows, columns, values, max_gap=0):
+        """Write values to cells, grouped into as few rectangular ranges as possible.
+
+        Parameters
+        ----------
+        rows : array-like
+            Sheet row of each value
+        columns : array-like
+            Column letter of each value
+        values : array-like
+            Values to write
+        max_gap : int, optional
+            Largest run of untouched cells that may be spanned by a single range, see `plan_updates`.
+            By default 0.
+        """
+        values = serialize_column(values)
         r = update_cells(
             rows,
             columns,
             values,
-            self._service,
+            self.service,
             self._sheet_id,
             self._sheet_name,
             self._key,
+            max_gap=max_gap,
+            executor=self._executor,
         )
+        self._after_write()
         return r
 
-    def set_value_series(self, s, column_name=None):
-        if column_name is None:
-            column_name = s.name
-        rows = s.index.values
-        columns = [self.column_mapping[column_name]] * len(rows)
-        values = s.values
-        self.set_values(rows, columns, values)
+    def set_value_series(self, s, column_name=None, max_gap=0):
+        rows, columns, values = self._series_cells(s, column_name)
+        return self.set_values(rows, columns, values, max_gap=max_gap)
 
     def append_data(self, data, add_blank_rows=False):
         """Assume data is same column form as downloaded data"""
-        for col in data.columns:
-            data[col] = process_column(data[col])
-        data_ready = data.fillna("").values
-        return append_cells(
+        data_ready = serialize_frame(data)
+        r = append_cells(
             data_ready,
             range=self.sheet_range,
-            service=self._service,
+            service=self.service,
             sheet_id=self._sheet_id,
             add_blank_rows=add_blank_rows,
+            executor=self._executor,
+        )
+        self._after_write()
+        return r
+
+
+def batch_update_data(processors):
+    """Refresh the data of several SheetProcessors with one batchGet request per spreadsheet.
+
+    Processors that share a spreadsheet id and service object are read together, and each
+    range is processed with its own column names and validation map.
+
+    Parameters
+    ----------
+    processors : list of SheetProcessor
+        Processors to refresh. Processors built from the same token file share the pooled
+        service of the calling thread.
+
+    Returns
+    -------
+    list
+        Data of each processor, in the same order as the processors.
+
+    Raises
+    ------
+    HttpError
+        If a read fails after retries. Processors of that spreadsheet keep their data.
+    """
+    groups = {}
+    for processor in processors:
+        groups.setdefault((processor.sheet_id, id(processor.service)), []).append(
+            processor
         )
 
+    for group in groups.values():
+        first = group[0]
+        value_ranges = get_sheet_batch_raw(
+            first.service,
+            first.sheet_id,
+            [p.sheet_range for p in group],
+            key=first._key,
+            executor=first._executor,
+        )
+        for processor, value_range in zip(group, value_ranges):
+            processor._ingest_raw(value_range)
+    return [processor.data for processor in processors]
+
 
 def sheet_service(token_file, secrets_file):
-    creds = get_credentials(token_file, secrets_file)
-    service = build("sheets", "v4", credentials=creds)
-    return service
+    return default_pool().service(token_file, secrets_file)
 
 
-def get_sheet_raw(service, sheet_id, range, key=None):
+def get_sheet_raw(service, sheet_id, range, key=None, executor=None):
+    if executor is None:
+        executor = default_executor()
     sheet = service.spreadsheets()
-    try:
-        sheet_data = (
-            sheet.values().get(spreadsheetId=sheet_id, range=range, key=key).execute()
+    with instrumentation.timed("api_call", method="get", kind="read") as record:
+        sheet_data = executor.execute(
+            lambda: sheet.values().get(spreadsheetId=sheet_id, range=range, key=key),
+            kind="read",
+            record=record,
         )
-    except HttpError as err:
-        print(err)
-        sheet_data = None
+        if record is not None:
+            _record_response(record, sheet_data, [sheet_data])
     return sheet_data
 
 
-def _package_batch_update(rows, columns, values, sheet_name=None):
-    rows = np.atleast_1d(rows)
-    columns = np.atleast_1d(columns)
-    values = np.atleast_1d(values)
-    data = []
-    for r, c, v in zip(rows, columns, values):
-        data.append(
-            {
-                "range": set_range((r, r), (c, c), sheet_name=sheet_name),
-                "values": [[v]],
-            }
+def get_sheet_batch_raw(service, sheet_id, ranges, key=None, executor=None):
+    "Get several ranges of a spreadsheet in one request, returning the list of value ranges"
+    if executor is None:
+        executor = default_executor()
+    sheet = service.spreadsheets()
+    with instrumentation.timed("api_call", method="batchGet", kind="read") as record:
+        sheet_data = executor.execute(
+            lambda: sheet.values().batchGet(
+                spreadsheetId=sheet_id, ranges=ranges, key=key
+            ),
+            kind="read",
+            record=record,
         )
+        if record is not None:
+            _record_response(record, sheet_data, sheet_data.get("valueRanges", []))
+    return sheet_data.get("valueRanges", [])
+
+
+def _record_response(record, response, value_ranges):
+    record["response_bytes"] = _payload_bytes(response)
+    values = [vr.get("values", []) for vr in value_ranges]
+    record["rows"] = sum(len(v) for v in values)
+    record["cells"] = sum(_cell_count(v) for v in values)
+
+
+def _body_values(body):
+    if "data" in body:
+        return [entry["values"] for entry in body["data"]]
+    return [body["values"]]
+
+
+def _record_write(record, bodies, report):
+    bodies = bodies[: len(bodies) - len(report.unsent)]
+    values = [v for body in bodies for v in _body_values(body)]
+    record["ok"] = report.ok
+    record["requests"] = len(bodies)
+    record["retries"] = report.retries
+    record["request_bytes"] = sum(_payload_bytes(b) for b in bodies)
+    record["response_bytes"] = sum(_payload_bytes(r) for r in report.responses)
+    record["rows"] = sum(len(v) for v in values)
+    record["cells"] = sum(_cell_count(v) for v in values)
+
+
+def _execute_write(executor, make_request, bodies, method, ordered=False):
+    with instrumentation.timed("api_call", method=method, kind="write") as record:
+        report = executor.execute_chunks(
+            make_request, bodies, kind="write", ordered=ordered
+        )
+        if record is not None:
+            _record_write(record, bodies, report)
+    return report
+
+
+def _package_batch_update(rows, columns, values, sheet_name=None, max_gap=0):
+    data = plan_updates(rows, columns, values, sheet_name=sheet_name, max_gap=max_gap)
     body = {"valueInputOption": "USER_ENTERED", "data": data}
     return body
 
 
-def update_cells(rows, columns, values, service, sheet_id, sheet_name=None, key=None):
+def update_cells(
+    rows,
+    columns,
+    values,
+    service,
+    sheet_id,
+    sheet_name=None,
+    key=None,
+    max_gap=0,
+    executor=None,
+):
+    """Write cell values with a values batchUpdate, split into requests under the size limits.
+
+    Returns
+    -------
+    ExecutionReport
+        Responses and any chunks that failed after retries.
+    """
+    if executor is None:
+        executor = default_executor()
     sheet = service.spreadsheets()
-    body = _package_batch_update(rows, columns, values, sheet_name)
-    try:
-        sheet.values().batchUpdate(spreadsheetId=sheet_id, body=body, key=key).execute()
-    except HttpError as err:
-        print(err)
+    body = _package_batch_update(rows, columns, values, sheet_name, max_gap=max_gap)
+    return _execute_write(
+        executor,
+        lambda b: sheet.values().batchUpdate(spreadsheetId=sheet_id, body=b, key=key),
+        executor.split_batch_update(body),
+        "batchUpdate",
+    )
 
 
 def _package_append_data(data, add_blank_rows):
-    values = []
-    for ii, row in enumerate(data):
-        if add_blank_rows:
-            values.append(["---" for x in row])
-        values.append([str(x) for x in row])
+    values = [list(map(str, row)) for row in data]
+    if add_blank_rows and len(values) > 0:
+        blank_row = ["---"] * len(values[0])
+        values = [r for row in values for r in (blank_row, row)]
 
     body = {"values": values}
     return body
 
 
-def append_cells(data, range, service, sheet_id, add_blank_rows=False, key=None):
+def append_cells(
+    data, range, service, sheet_id, add_blank_rows=False, key=None, executor=None
+):
+    """Append rows after the table in range, split into requests under the size limits.
+
+    Chunks are sent in order and sending stops at the first chunk that fails, so the rows
+    written are always a prefix of data.
+
+    Returns
+    -------
+    ExecutionReport
+        Responses, the chunk that failed after retries and the chunks left unsent after it.
+    """
+    if executor is None:
+        executor = default_executor()
     sheet = service.spreadsheets()
     body = _package_append_data(data, add_blank_rows)
-    try:
-        sheet.values().append(
+    return _execute_write(
+        executor,
+        lambda b: sheet.values().append(
             spreadsheetId=sheet_id,
             range=range,
             valueInputOption="USER_ENTERED",
             insertDataOption="INSERT_ROWS",
-            body=body,
+            body=b,
             key=key,
-        ).execute()
-    except HttpError as err:
-        print(err)
+        ),
+        executor.split_append(body),
+        "append",
+        ordered=True,
+    )
 
 
 def parse_range(range_str):
@@ -224,24 +596,26 @@ def parse_range(range_str):
     return base_row, base_col, sheet
 
 
-def set_range(rows, columns, sheet_name=None):
-    colrow_range = (
-        f"{columns[0]}{rows[0]}:{columns[1]}{rows[1] if rows[1] is not None else ''}"
-    )
-    if sheet_name is None:
-        return colrow_range
-    else:
-        return f"{sheet_name}!{colrow_range}"
+def _pad_columns(data, n_columns):
+    "Pad or trim rows to n_columns and return a 2d object array, with None for missing cells"
+    padded = [
+        row[:n_columns] if len(row) >= n_columns else row + [None] * (n_columns - len(row))
+        for row in data
+    ]
+    grid = np.empty((len(padded), n_columns), dtype=object)
+    if len(padded) > 0:
+        grid[:] = padded
+    return grid
 
 
 def process_records(data, columns, validation_map):
-    records = []
-    for row in data:
-        record = {}
+    with instrumentation.timed("stage", name="process_records", rows=len(data)):
+        grid = _pad_columns(data, len(columns))
+        processed = {}
         for ii, k in enumerate(columns):
-            if ii < len(row):
-                record[k] = validation_map.get(k, lambda x: x)(row[ii])
-            else:
-                record[k] = pd.NA
-        records.append(record)
-    return pd.DataFrame.from_records(records, columns=columns)
+            validator = column_validator(validation_map.get(k))
+            values = validator(grid[:, ii])
+            if not isinstance(values, ExtensionArray):
+                values = _object_array(values)
+            processed[k] = values
+        return pd.DataFrame(processed, columns=columns).infer_objects()
@@ -0,0 +1,251 @@
+import numpy as np
+import pandas as pd
+
+from .comparison import AnnotationComparison, convert_dataframe
+from .processing import _package_append_data, _package_batch_update
+from .validation import serialize_column, serialize_frame
+
+__all__ = ["SyncPlan", "plan_sync", "sync_sheet"]
+
+
+class SyncPlan:
+    """Writes needed to bring a sheet up to date with a dataframe.
+
+    Parameters
+    ----------
+    processor : SheetProcessor
+        Processor for the target sheet
+    appends : pd.DataFrame
+        Rows to append, with the processor's columns in sheet order.
+    updates : pd.DataFrame
+        One row per changed cell, from `AnnotationComparison.changed_cells` with row numbers
+        and a column_letter column.
+    removed_ids : array-like
+        Ids that are in the sheet but not in the dataframe. These are reported but not written.
+    max_gap : int, optional
+        Largest run of untouched cells spanned by a single update range, see `plan_updates`.
+    add_blank_rows : bool, optional
+        If True, appended rows are interleaved with separator rows, by default False
+    """
+
+    def __init__(
+        self, processor, appends, updates, removed_ids, max_gap=0, add_blank_rows=False
+    ):
+        self._processor = processor
+        self._appends = appends
+        self._updates = updates
+        self._removed_ids = np.asarray(removed_ids)
+        self._max_gap = max_gap
+        self._add_blank_rows = add_blank_rows
+        self.reports = None
+
+    @property
+    def appends(self):
+        return self._appends
+
+    @property
+    def updates(self):
+        return self._updates
+
+    @property
+    def removed_ids(self):
+        return self._removed_ids
+
+    def batch_update_bodies(self):
+        "Values batchUpdate request bodies that `execute` sends, after splitting to the size limits"
+        if len(self._updates) == 0:
+            return []
+        body = _package_batch_update(
+            self._updates["row"].to_numpy(),
+            self._updates["column_letter"].to_numpy(),
+            serialize_column(self._updates["new_value"]),
+            self._processor.sheet_name,
+            max_gap=self._max_gap,
+        )
+        return self._processor.executor.split_batch_update(body)
+
+    def append_bodies(self):
+        "Values append request bodies that `execute` sends, after splitting to the size limits"
+        if len(self._appends) == 0:
+            return []
+        body = _package_append_data(
+            serialize_frame(self._appends), self._add_blank_rows
+        )
+        return self._processor.executor.split_append(body)
+
+    def summary(self):
+        "Number of appended rows, updated cells, removed ids and requests"
+        return {
+            "appended_rows": len(self._appends),
+            "updated_cells": len(self._updates),
+            "removed": len(self._removed_ids),
+            "requests": len(self.batch_update_bodies()) + len(self.append_bodies()),
+        }
+
+    def execute(self):
+        """Send the cell updates, then the appends.
+
+        The appends are only sent once every update went through. `reports` is set before
+        anything is raised, so it shows what was written.
+
+        Returns
+        -------
+        dict
+            ExecutionReport for "update" and "append", or None where there was nothing to send.
+
+        Raises
+        ------
+        HttpError
+            Error of the first failed chunk, if a write still failed after retries.
+        """
+        self.reports = {"update": None, "append": None}
+        if len(self._updates) > 0:
+            self.reports["update"] = self._processor.set_values(
+                self._updates["row"].to_numpy(),
+                self._updates["column_letter"].to_numpy(),
+                self._updates["new_value"],
+                max_gap=self._max_gap,
+            )
+            _raise_failure(self.reports["update"])
+        if len(self._appends) > 0:
+            self.reports["append"] = self._processor.append_data(
+                self._appends, add_blank_rows=self._add_blank_rows
+            )
+            _raise_failure(self.reports["append"])
+        return self.reports
+
+
+def _raise_failure(report):
+    if not report.ok:
+        _, err = report.failures[0]
+        raise err
+
+
+def plan_sync(
+    df,
+    schema,
+    processor,
+    id_column,
+    max_gap=0,
+    add_blank_rows=False,
+    refresh=True,
+    comparators=None,
+):
+    """Work out the appends and cell updates that bring a sheet up to date with a dataframe.
+
+    The dataframe is converted with the schema, then compared by id against the sheet data.
+    Ids missing from the sheet become appended rows and differing values in shared columns
+    become cell updates, located through the `table_row` index of the sheet data.
+    Rows in the sheet without an id are ignored.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Source data, e.g. a database query result.
+    schema : dict or None
+        dfbridge schema mapping df to the sheet column names, see `convert_dataframe`.
+        If None, df is used as is.
+    processor : SheetProcessor
+        Processor for the target sheet
+    id_column : str
+        Column that identifies rows in both the converted data and the sheet.
+    max_gap : int, optional
+        Largest run of untouched cells spanned by a single update range, see `plan_updates`.
+        By default 0.
+    add_blank_rows : bool, optional
+        If True, appended rows are interleaved with separator rows, by default False
+    refresh : bool, optional
+        If True, download the sheet before comparing. If False, compare against the data the
+        processor already holds, which is stale after earlier writes. By default True.
+        A failed download raises rather than planning against data that was not read.
+    comparators : dict, optional
+        Comparator for some columns, see `AnnotationComparison`. Sheet values come back as
+        validated strings, so e.g. `comparators.coerced_equality()` keeps 1 and "1" from
+        being written again. By default None.
+
+    Returns
+    -------
+    SyncPlan
+
+    Raises
+    ------
+    HttpError
+        If reading the sheet fails after retries. Nothing is planned or written.
+    """
+    if schema is not None:
+        df = convert_dataframe(df, schema)
+    columns = [
+        c for c in processor.column_names if c in df.columns and c != id_column
+    ]
+    sheet = processor.update_data() if refresh else processor.data
+    sheet = sheet[sheet[id_column].notna()]
+
+    comp = AnnotationComparison(
+        df[[id_column] + columns],
+        sheet[[id_column] + columns],
+        id_column,
+        comparators=comparators,
+    )
+    result = comp.diff()
+
+    appends = result.new_annotations.reindex(columns=processor.column_names)
+    updates = comp.changed_cells(
+        row_mapping=pd.Series(sheet.index.to_numpy(), index=sheet[id_column])
+    )
+    updates["column_letter"] = updates["column"].map(processor.column_mapping)
+    return SyncPlan(
+        processor,
+        appends,
+        updates,
+        result.removed_ids,
+        max_gap=max_gap,
+        add_blank_rows=add_blank_rows,
+    )
+
+
+def sync_sheet(
+    df,
+    schema,
+    processor,
+    id_column,
+    dry_run=False,
+    max_gap=0,
+    add_blank_rows=False,
+    refresh=True,
+    comparators=None,
+):
+    """Write only what changed between a dataframe and a sheet.
+
+    Builds a `SyncPlan` with `plan_sync` and, unless dry_run is set, sends it as batched
+    cell updates followed by batched appends.
+
+    Parameters
+    ----------
+    dry_run : bool, optional
+        If True, return the plan without writing anything, by default False
+
+    Other parameters are as for `plan_sync`.
+
+    Returns
+    -------
+    SyncPlan
+        The plan, with `reports` set to the execution reports if it was sent.
+
+    Raises
+    ------
+    HttpError
+        If reading the sheet fails, or a write fails after retries, see `SyncPlan.execute`.
+    """
+    plan = plan_sync(
+        df,
+        schema,
+        processor,
+        id_column,
+        max_gap=max_gap,
+        add_blank_rows=add_blank_rows,
+        refresh=refresh,
+        comparators=comparators,
+    )
+    if not dry_run:
+        plan.execute()
+    return plan
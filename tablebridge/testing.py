@@ -0,0 +1,477 @@
+import re
+import json
+import time
+import random
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import httplib2
+from .auth import HttpError
+from .utils import column_to_number, number_to_column
+
+__all__ = ["FakeSheetsService", "FakeSheetsServer"]
+
+DEFAULT_SHEET = "Sheet1"
+
+_RANGE_PATTERN = re.compile(
+    r"^(?:(?P<sheet>'(?:[^']|'')+'|[^!]+)!)?"
+    r"(?P<c0>[A-Z]*)(?P<r0>\d*)(?::(?P<c1>[A-Z]*)(?P<r1>\d*))?$"
+)
+
+
+def _http_error(status, message, retry_after=None):
+    info = {"status": status}
+    if retry_after is not None:
+        info["retry-after"] = str(retry_after)
+    content = json.dumps({"error": {"code": status, "message": message}}).encode()
+    return HttpError(httplib2.Response(info), content, uri="fake://sheets")
+
+
+class _GridRange:
+    "Parsed A1 range with 0-based, end-exclusive bounds. None marks an open bound."
+
+    def __init__(self, sheet, row0, row1, col0, col1):
+        self.sheet = sheet
+        self.row0, self.row1 = row0, row1
+        self.col0, self.col1 = col0, col1
+
+    @classmethod
+    def parse(cls, range_str):
+        match = _RANGE_PATTERN.match(range_str)
+        if match is None:
+            if "!" not in range_str:
+                # A bare sheet name is the whole sheet
+                return cls(range_str.strip("'"), 0, None, 0, None)
+            raise _http_error(400, f"Unable to parse range: {range_str}")
+        sheet, c0, r0, c1, r1 = match.group("sheet", "c0", "r0", "c1", "r1")
+        if sheet is None:
+            sheet = DEFAULT_SHEET
+        elif sheet.startswith("'"):
+            sheet = sheet[1:-1].replace("''", "'")
+        if c1 is None:
+            if c0 == "" and r0 == "":
+                return cls(sheet, 0, None, 0, None)
+            if c0 == "" or r0 == "":
+                raise _http_error(400, f"Unable to parse range: {range_str}")
+            c1, r1 = c0, r0
+        if (c0 == "" and r0 == "") or (c1 == "" and r1 == ""):
+            raise _http_error(400, f"Unable to parse range: {range_str}")
+        if r0 == "0" or r1 == "0" or r0.startswith("0") or r1.startswith("0"):
+            raise _http_error(400, f"Unable to parse range: {range_str}")
+
+        row0 = int(r0) - 1 if r0 else 0
+        row1 = int(r1) if r1 else None
+        col0 = column_to_number(c0) if c0 else 0
+        col1 = column_to_number(c1) + 1 if c1 else None
+        # Reversed corners are normalized, like the API does
+        if row1 is not None and row1 <= row0:
+            row0, row1 = row1 - 1, row0 + 1
+        if col1 is not None and col1 <= col0:
+            col0, col1 = col1 - 1, col0 + 1
+        return cls(sheet, row0, row1, col0, col1)
+
+    def a1(self, n_rows=None, n_cols=None):
+        "A1 string of the range, closing open bounds with the given extent"
+        row1 = self.row1 if self.row1 is not None else self.row0 + max(n_rows or 1, 1)
+        col1 = self.col1 if self.col1 is not None else self.col0 + max(n_cols or 1, 1)
+        return (
+            f"{self.sheet}!{number_to_column(self.col0)}{self.row0 + 1}:"
+            f"{number_to_column(col1 - 1)}{row1}"
+        )
+
+
+def _trim(rows):
+    "Drop trailing empty cells in each row and trailing empty rows, like the API does"
+    out = []
+    for row in rows:
+        end = len(row)
+        while end > 0 and row[end - 1] in ("", None):
+            end -= 1
+        out.append(["" if x is None else x for x in row[:end]])
+    while out and len(out[-1]) == 0:
+        out.pop()
+    return out
+
+
+def _cell_text(value):
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    return str(value)
+
+
+class _FakeRequest:
+    def __init__(self, service, kind, method, body, func):
+        self._service = service
+        self._kind = kind
+        self._method = method
+        self._body = body
+        self._func = func
+
+    def execute(self, num_retries=0):
+        return self._service._call(self._kind, self._method, self._body, self._func)
+
+
+class FakeSheetsService:
+    """In-memory stand-in for the Sheets API service used by `SheetProcessor`.
+
+    Implements the `spreadsheets().values()` methods `get`, `batchGet`, `append` and
+    `batchUpdate` on an in-memory grid of strings per spreadsheet and sheet, with A1 range
+    parsing and response shapes like the real API. Requests can be slowed down and made to
+    fail like quota-limited calls, which raise `HttpError` just as the client library does.
+    Every executed request is recorded in `log`.
+
+    Parameters
+    ----------
+    latency : float or callable, optional
+        Seconds each request takes, or a function of a `random.Random` returning them, e.g.
+        `lambda rng: rng.lognormvariate(-3, 0.5)`. By default 0.
+    read_quota_per_minute : int or None, optional
+        Reads allowed in any 60 second window before requests fail with status 429.
+        By default None, which never limits.
+    write_quota_per_minute : int or None, optional
+        Same as read_quota_per_minute, for writes.
+    error_rate : float, optional
+        Probability that a request fails with status 429 regardless of quota, by default 0
+    retry_after : float or None, optional
+        Value of the retry-after header on 429 responses, by default None
+    max_request_bytes : int or None, optional
+        Largest JSON request body accepted. Larger requests fail with status 400.
+        By default None, which accepts any size.
+    max_request_cells : int or None, optional
+        Most cells accepted in one write request, with the same behavior as max_request_bytes.
+    seed : int, optional
+        Seed for latency and error injection
+    """
+
+    def __init__(
+        self,
+        latency=0.0,
+        read_quota_per_minute=None,
+        write_quota_per_minute=None,
+        error_rate=0.0,
+        retry_after=None,
+        max_request_bytes=None,
+        max_request_cells=None,
+        seed=None,
+    ):
+        self._latency = latency
+        self._quota = {"read": read_quota_per_minute, "write": write_quota_per_minute}
+        self._calls = {"read": deque(), "write": deque()}
+        self._error_rate = error_rate
+        self._retry_after = retry_after
+        self._max_request_bytes = max_request_bytes
+        self._max_request_cells = max_request_cells
+        self._rng = random.Random(seed)
+        self._grids = {}
+        self._lock = threading.Lock()
+        self.log = []
+
+    # Grid access for setting up and checking tests
+
+    def set_grid(self, spreadsheet_id, values, sheet_name=DEFAULT_SHEET):
+        "Replace the contents of a sheet with rows of values"
+        with self._lock:
+            self._grids[(spreadsheet_id, sheet_name)] = [
+                [_cell_text(x) or "" for x in row] for row in values
+            ]
+
+    def grid(self, spreadsheet_id, sheet_name=DEFAULT_SHEET):
+        "Copy of the contents of a sheet as rows of strings"
+        with self._lock:
+            return [list(row) for row in self._grid(spreadsheet_id, sheet_name)]
+
+    def _grid(self, spreadsheet_id, sheet_name):
+        return self._grids.setdefault((spreadsheet_id, sheet_name), [])
+
+    # Client library surface
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId, range, key=None, **kwargs):
+        return _FakeRequest(
+            self, "read", "get", None, lambda: self._get(spreadsheetId, range)
+        )
+
+    def batchGet(self, spreadsheetId, ranges, key=None, **kwargs):
+        if isinstance(ranges, str):
+            ranges = [ranges]
+        return _FakeRequest(
+            self,
+            "read",
+            "batchGet",
+            None,
+            lambda: {
+                "spreadsheetId": spreadsheetId,
+                "valueRanges": [self._get(spreadsheetId, r) for r in ranges],
+            },
+        )
+
+    def batchUpdate(self, spreadsheetId, body, key=None, **kwargs):
+        return _FakeRequest(
+            self,
+            "write",
+            "batchUpdate",
+            body,
+            lambda: self._batch_update(spreadsheetId, body),
+        )
+
+    def append(
+        self,
+        spreadsheetId,
+        range,
+        body,
+        valueInputOption=None,
+        insertDataOption=None,
+        key=None,
+        **kwargs,
+    ):
+        return _FakeRequest(
+            self, "write", "append", body, lambda: self._append(spreadsheetId, range, body)
+        )
+
+    # Request execution
+
+    def _check_quota(self, kind, now):
+        quota = self._quota[kind]
+        if quota is None:
+            return True
+        calls = self._calls[kind]
+        while calls and now - calls[0] >= 60:
+            calls.popleft()
+        if len(calls) >= quota:
+            return False
+        calls.append(now)
+        return True
+
+    def _call(self, kind, method, body, func):
+        t0 = time.perf_counter()
+        latency = self._latency(self._rng) if callable(self._latency) else self._latency
+        if latency > 0:
+            time.sleep(latency)
+
+        entry = {
+            "method": method,
+            "kind": kind,
+            "request_bytes": 0 if body is None else len(json.dumps(body)),
+            "cells": _body_cells(body),
+        }
+        with self._lock:
+            try:
+                if not self._check_quota(kind, time.monotonic()) or (
+                    self._error_rate > 0 and self._rng.random() < self._error_rate
+                ):
+                    raise _http_error(
+                        429, "Quota exceeded for quota metric", self._retry_after
+                    )
+                if self._max_request_bytes is not None and entry["request_bytes"] > self._max_request_bytes:
+                    raise _http_error(400, "Request payload size exceeds the limit")
+                if self._max_request_cells is not None and entry["cells"] > self._max_request_cells:
+                    raise _http_error(400, "Request has too many cells")
+                response = func()
+                entry["status"] = 200
+            except HttpError as err:
+                entry["status"] = err.resp.status
+                raise
+            finally:
+                entry["seconds"] = time.perf_counter() - t0
+                self.log.append(entry)
+        return response
+
+    def _get(self, spreadsheet_id, range_str):
+        rng = _GridRange.parse(range_str)
+        grid = self._grid(spreadsheet_id, rng.sheet)
+        rows = [row[rng.col0 : rng.col1] for row in grid[rng.row0 : rng.row1]]
+        values = _trim(rows)
+        out = {
+            "range": rng.a1(len(values), max((len(r) for r in values), default=1)),
+            "majorDimension": "ROWS",
+        }
+        if values:
+            out["values"] = values
+        return out
+
+    def _write(self, grid, row0, col0, values):
+        for ii, row in enumerate(values):
+            r = row0 + ii
+            while len(grid) <= r:
+                grid.append([])
+            target = grid[r]
+            for jj, value in enumerate(row):
+                value = _cell_text(value)
+                if value is None:
+                    continue
+                c = col0 + jj
+                if len(target) <= c:
+                    target.extend([""] * (c + 1 - len(target)))
+                target[c] = value
+
+    def _batch_update(self, spreadsheet_id, body):
+        responses = []
+        for entry in body.get("data", []):
+            rng = _GridRange.parse(entry["range"])
+            values = entry.get("values", [])
+            n_cols = max((len(r) for r in values), default=0)
+            if (rng.row1 is not None and len(values) > rng.row1 - rng.row0) or (
+                rng.col1 is not None and n_cols > rng.col1 - rng.col0
+            ):
+                raise _http_error(
+                    400,
+                    f"Requested writing within range [{entry['range']}], but tried writing "
+                    "outside of it",
+                )
+            self._write(self._grid(spreadsheet_id, rng.sheet), rng.row0, rng.col0, values)
+            responses.append(
+                {
+                    "spreadsheetId": spreadsheet_id,
+                    "updatedRange": rng.a1(len(values), n_cols),
+                    "updatedRows": len(values),
+                    "updatedColumns": n_cols,
+                    "updatedCells": sum(len(r) for r in values),
+                }
+            )
+        return {
+            "spreadsheetId": spreadsheet_id,
+            "totalUpdatedRows": sum(r["updatedRows"] for r in responses),
+            "totalUpdatedCells": sum(r["updatedCells"] for r in responses),
+            "responses": responses,
+        }
+
+    def _append(self, spreadsheet_id, range_str, body):
+        rng = _GridRange.parse(range_str)
+        grid = self._grid(spreadsheet_id, rng.sheet)
+        values = body.get("values", [])
+
+        # The table ends at the last row with a value inside the range's columns
+        end = rng.row0
+        stop = len(grid) if rng.row1 is None else min(len(grid), rng.row1)
+        for r in range(rng.row0, stop):
+            if any(x != "" for x in grid[r][rng.col0 : rng.col1]):
+                end = r + 1
+        # INSERT_ROWS semantics: rows below the table move down
+        grid[end:end] = [[] for _ in values]
+        self._write(grid, end, rng.col0, values)
+
+        n_cols = max((len(r) for r in values), default=0)
+        written = _GridRange(rng.sheet, end, end + len(values), rng.col0, rng.col0 + max(n_cols, 1))
+        return {
+            "spreadsheetId": spreadsheet_id,
+            "tableRange": _GridRange(rng.sheet, rng.row0, end, rng.col0, rng.col1).a1(),
+            "updates": {
+                "updatedRange": written.a1(),
+                "updatedRows": len(values),
+                "updatedColumns": n_cols,
+                "updatedCells": sum(len(r) for r in values),
+            },
+        }
+
+
+def _body_cells(body):
+    if body is None:
+        return 0
+    if "data" in body:
+        return sum(len(row) for entry in body["data"] for row in entry.get("values", []))
+    return sum(len(row) for row in body.get("values", []))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _dispatch(self, body):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        match = re.match(r"^/v4/spreadsheets/([^/]+)/values(.*)$", url.path)
+        if match is None:
+            return self._reply(404, {"error": {"code": 404, "message": "Not found"}})
+        sheet_id, rest = match.groups()
+        values = self.service.values()
+        if self.command == "GET" and rest == ":batchGet":
+            request = values.batchGet(spreadsheetId=sheet_id, ranges=query.get("ranges", []))
+        elif self.command == "GET" and rest.startswith("/"):
+            request = values.get(spreadsheetId=sheet_id, range=unquote(rest[1:]))
+        elif self.command == "POST" and rest == ":batchUpdate":
+            request = values.batchUpdate(spreadsheetId=sheet_id, body=body)
+        elif self.command == "POST" and rest.endswith(":append"):
+            request = values.append(
+                spreadsheetId=sheet_id, range=unquote(rest[1 : -len(":append")]), body=body
+            )
+        else:
+            return self._reply(404, {"error": {"code": 404, "message": "Not found"}})
+
+        try:
+            self._reply(200, request.execute())
+        except HttpError as err:
+            headers = {}
+            if err.resp.get("retry-after") is not None:
+                headers["Retry-After"] = err.resp["retry-after"]
+            self._reply(err.resp.status, json.loads(err.content), headers)
+
+    def do_GET(self):
+        self._dispatch(None)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self._dispatch(json.loads(self.rfile.read(length) or b"{}"))
+
+
+class FakeSheetsServer:
+    """Serve a `FakeSheetsService` over HTTP on localhost, e.g. for `AsyncSheetsClient(base_url=server.url)`.
+
+    Use as a context manager, or call `start` and `stop`.
+
+    Parameters
+    ----------
+    service : FakeSheetsService, optional
+        Service to serve. By default a new one with no latency or limits.
+    port : int, optional
+        Port to listen on, by default 0 which picks a free port
+    """
+
+    def __init__(self, service=None, port=0):
+        if service is None:
+            service = FakeSheetsService()
+        self.service = service
+        handler = type("Handler", (_Handler,), {"service": service})
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
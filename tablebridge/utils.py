@@ -1,6 +1,7 @@
 import numpy as np
 import pandas as pd
-import string
+from .points import PointArray, PointDtype
+from .addressing import column_letters, column_numbers
 
 
 def row_differs(row, data_columns_a, data_columns_b):
@@ -12,24 +13,113 @@ def row_differs(row, data_columns_a, data_columns_b):
     return False
 
 
+def _comparable_values(col):
+    values = col.to_numpy()
+    if values.dtype.kind in "biufcmM":
+        return values
+    return col.to_numpy(dtype=object)
+
+
+def _cell_differs(a, b):
+    return bool(np.any(np.asarray(a) != np.asarray(b)))
+
+
+def _as_points(col):
+    if isinstance(col.dtype, PointDtype):
+        return col.array
+    try:
+        return PointArray._from_sequence(col.to_numpy(dtype=object))
+    except (TypeError, ValueError):
+        return None
+
+
+def column_differs(col_a, col_b):
+    """Vectorized comparison of two aligned columns.
+
+    Cells where both values are NA count as equal, cells where exactly one is NA differ.
+    List-valued cells are compared by value.
+
+    Parameters
+    ----------
+    col_a : pd.Series
+        First column
+    col_b : pd.Series
+        Second column, aligned positionally with the first.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean array, True where the values differ.
+    """
+    if isinstance(col_a.dtype, PointDtype) or isinstance(col_b.dtype, PointDtype):
+        points_a = _as_points(col_a)
+        points_b = _as_points(col_b)
+        if points_a is not None and points_b is not None:
+            return points_a.differs(points_b)
+
+    na_a = col_a.isna().to_numpy()
+    na_b = col_b.isna().to_numpy()
+    differs = na_a != na_b
+    both_valid = ~(na_a | na_b)
+    if not np.any(both_valid):
+        return differs
+
+    vals_a = _comparable_values(col_a)[both_valid]
+    vals_b = _comparable_values(col_b)[both_valid]
+    try:
+        cell_diff = np.asarray(vals_a != vals_b, dtype=bool)
+        if cell_diff.shape != vals_a.shape:
+            raise ValueError("Elementwise comparison did not broadcast")
+    except (ValueError, TypeError):
+        # Array-valued cells cannot be compared by a single object comparison.
+        cell_diff = np.fromiter(
+            (_cell_differs(a, b) for a, b in zip(vals_a, vals_b)),
+            dtype=bool,
+            count=len(vals_a),
+        )
+    differs[both_valid] = cell_diff
+    return differs
+
+
+def rows_differ(df, data_columns_a, data_columns_b, comparators=None):
+    """Vectorized equivalent of applying `row_differs` to every row of a dataframe.
+
+    Parameters
+    ----------
+    comparators : list, optional
+        Comparator for each pair of columns, with None for `column_differs`. By default
+        every pair uses `column_differs`.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean array, True for rows where any pair of columns differs.
+    """
+    if comparators is None:
+        comparators = [None] * len(data_columns_a)
+    differs = np.zeros(len(df), dtype=bool)
+    for dca, dcb, comparator in zip(data_columns_a, data_columns_b, comparators):
+        if comparator is None:
+            comparator = column_differs
+        differs |= comparator(df[dca], df[dcb])
+    return differs
+
+
 def number_to_column(n, offset=0):
-    n = n + offset
-    letters = ""
-    divisor = 1
-    while divisor > 0:
-        letters = string.ascii_uppercase[np.remainder(n, 25)] + letters
-        divisor = np.floor(n / 25).astype(int)
-        n = divisor - 1
-    return letters
+    "Column letters of the 0-based column number n + offset, e.g. 0 -> A, 26 -> AA"
+    return column_letters(int(n + offset))
 
 
 def column_to_number(aa):
-    number = 0
-    for ii, letter in enumerate(aa[::-1]):
-        base = 25 ** ii
-        dig = (
-            np.flatnonzero(np.array([x for x in string.ascii_uppercase]) == letter)[0]
-            + 1
-        )
-        number += dig * base
-    return number - 1
+    "0-based column number of column letters, e.g. A -> 0, AA -> 26"
+    return column_numbers(aa)
+
+
+def set_range(rows, columns, sheet_name=None):
+    colrow_range = (
+        f"{columns[0]}{rows[0]}:{columns[1]}{rows[1] if rows[1] is not None else ''}"
+    )
+    if sheet_name is None:
+        return colrow_range
+    else:
+        return f"{sheet_name}!{colrow_range}"
@@ -1,9 +1,30 @@
+import functools
 import numpy as np
 import pandas as pd
-import re
 from collections import abc
+from .points import (
+    PointArray,
+    PointDtype,
+    POINT_PATTERN,
+    parse_points,
+    join_text_columns,
+)
 
-__all__ = ["process_int", "process_uint64", "process_point", "no_validation"]
+__all__ = [
+    "process_int",
+    "process_uint64",
+    "process_point",
+    "no_validation",
+    "columnwise",
+    "with_dtype",
+    "column_validator",
+    "process_int_column",
+    "process_uint64_column",
+    "process_point_column",
+    "serialize_column",
+    "serialize_frame",
+    "no_validation_column",
+]
 
 
 def process_int(x):
@@ -23,7 +44,7 @@ def process_uint64(x):
 def process_point(x):
     if len(x) == 0:
         return pd.NA
-    grp = re.search("(\d+)[,\s]*(\d+)[,\s]*(\d+)", x)
+    grp = POINT_PATTERN.search(x)
     if grp is None:
         return pd.NA
     else:
@@ -37,6 +58,162 @@ def no_validation(x):
         return x
 
 
+def columnwise(func):
+    """Mark a validator as column-wise.
+
+    Column-wise validators get a whole column as an object array and return an array-like of the same length.
+    Cells past the end of a short row are passed as None and should come back as pd.NA.
+    """
+    func.columnwise = True
+    return func
+
+
+def _object_array(values):
+    "1d object array that keeps list-valued elements intact"
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+def _parse_integer_column(col, dtype, cell_func, convert):
+    col = np.asarray(col, dtype=object)
+    out = np.full(len(col), pd.NA, dtype=object)
+    present = ~pd.isna(col)
+    present[present] = col[present] != ""
+    try:
+        # Object to integer casting calls int() on each element in C, so accepts what the per-cell validator accepts.
+        out[present] = convert(col[present].astype(dtype))
+    except (TypeError, ValueError, OverflowError):
+        out[present] = _object_array([cell_func(x) for x in col[present]])
+    return out
+
+
+@columnwise
+def process_int_column(col):
+    "Column-wise equivalent of process_int"
+    return _parse_integer_column(
+        col, np.int64, process_int, lambda x: x.astype(object)
+    )
+
+
+@columnwise
+def process_uint64_column(col):
+    "Column-wise equivalent of process_uint64"
+    return _parse_integer_column(col, np.uint64, process_uint64, list)
+
+
+@columnwise
+def no_validation_column(col):
+    "Column-wise equivalent of no_validation"
+    s = pd.Series(col, dtype=object)
+    out = s.to_numpy(copy=True)
+    blank = (s.isna() | s.eq("")).to_numpy(dtype=bool)
+    out[blank] = pd.NA
+    return out
+
+
+def _parse_point_column(col):
+    try:
+        return parse_points(col)
+    except OverflowError:
+        return PointArray._from_sequence(_per_cell(process_point)(col))
+
+
+@columnwise
+def process_point_column(col):
+    """Column-wise equivalent of process_point, returning an object array of lists.
+
+    Use `with_dtype(process_point, "point")` to store the column as a PointArray instead.
+    """
+    try:
+        return np.asarray(parse_points(col))
+    except OverflowError:
+        return _per_cell(process_point)(col)
+
+
+_COLUMN_EQUIVALENTS = {
+    process_int: process_int_column,
+    process_uint64: process_uint64_column,
+    no_validation: no_validation_column,
+    process_point: process_point_column,
+}
+
+
+def _per_cell(func):
+    def column_func(col):
+        col = np.asarray(col, dtype=object)
+        out = np.full(len(col), pd.NA, dtype=object)
+        present = np.fromiter((x is not None for x in col), dtype=bool, count=len(col))
+        out[present] = _object_array([func(x) for x in col[present]])
+        return out
+
+    return column_func
+
+
+def with_dtype(func, dtype):
+    """Declare the dtype that a validator's column is stored as.
+
+    The returned validator validates like func, and `process_records` then casts the column,
+    e.g. to "Int64", "UInt64", "string[pyarrow]", "category" or "point". Compact dtypes take
+    a fraction of the memory of object columns.
+
+    Parameters
+    ----------
+    func : callable or None
+        Per-cell or column-wise validator. None uses `no_validation`.
+    dtype : str or dtype
+        Any dtype accepted by `pd.array`
+
+    Returns
+    -------
+    callable
+        Validator with `validator` and `dtype` attributes
+    """
+    base = no_validation if func is None else func
+
+    @functools.wraps(base)
+    def validator(x):
+        return base(x)
+
+    validator.validator = base
+    validator.dtype = dtype
+    validator.__qualname__ = f"{getattr(base, '__qualname__', repr(base))}[{dtype}]"
+    return validator
+
+
+def _is_point_dtype(dtype):
+    return isinstance(dtype, PointDtype) or (isinstance(dtype, str) and dtype == "point")
+
+
+def _cast_column(values, dtype):
+    if _is_point_dtype(dtype):
+        if isinstance(values, PointArray):
+            return values
+        return PointArray._from_sequence(values)
+    return pd.array(values, dtype=dtype)
+
+
+def column_validator(func):
+    """Get a column-wise validator for any validator.
+
+    Column-wise validators are returned as is, validators in this module are swapped for their
+    vectorized equivalents, and any other per-cell function is applied to each present cell.
+    Validators from `with_dtype` also cast the column to their dtype.
+    """
+    if hasattr(func, "dtype") and hasattr(func, "validator"):
+        dtype = func.dtype
+        if _is_point_dtype(dtype) and func.validator is process_point:
+            # Parse straight into the point array without building lists
+            return columnwise(_parse_point_column)
+        inner = column_validator(func.validator)
+        return columnwise(lambda col: _cast_column(inner(col), dtype))
+    if func is None:
+        return _per_cell(lambda x: x)
+    if getattr(func, "columnwise", False):
+        return func
+    if func in _COLUMN_EQUIVALENTS:
+        return _COLUMN_EQUIVALENTS[func]
+    return _per_cell(func)
+
+
 def stringify_list(x):
     if np.any(pd.isna(x)):
         return ""
@@ -59,5 +236,96 @@ def is_listlike(x):
     return isinstance(x, abc.Iterable) and not isinstance(x, excluded_types)
 
 
+def _text_array(values):
+    """str() of each value as an object array.
+
+    Casting with astype(str) instead would size every string by the longest one.
+    """
+    return np.fromiter(map(str, values), dtype=object, count=len(values))
+
+
+def _serialize_lists(values):
+    try:
+        numbers = np.array(list(values), dtype=np.float64)
+    except (TypeError, ValueError):
+        numbers = None
+    if numbers is not None and numbers.ndim == 2 and not np.any(np.isnan(numbers)):
+        # Rectangular numeric lists, e.g. points, are joined in one pass.
+        items = np.array(list(values), dtype=object)
+        text = _text_array(items.ravel()).reshape(items.shape)
+        return join_text_columns(text)
+    return _object_array([stringify_list(x) for x in values])
+
+
+def serialize_column(col):
+    """Convert a column to the strings written to a sheet, with blank strings for missing values.
+
+    Equivalent to applying `stringify_list` to list-like values and `blankify_nan` to everything else,
+    but converts whole columns at once based on dtype.
+
+    Parameters
+    ----------
+    col : pd.Series or array-like
+        Column values
+
+    Returns
+    -------
+    np.ndarray
+        Object array of strings
+    """
+    if isinstance(col, (pd.Series, pd.Index)):
+        values = col.to_numpy() if isinstance(col.dtype, np.dtype) else col.array
+    elif isinstance(col, (np.ndarray, pd.api.extensions.ExtensionArray)):
+        values = col
+    else:
+        values = _object_array(list(col))
+
+    if isinstance(values.dtype, PointDtype):
+        out = values.to_strings()
+        out[values.isna()] = ""
+        return out
+
+    if isinstance(values, np.ndarray) and values.dtype.kind in "biuf":
+        out = values.astype(str).astype(object)
+        if values.dtype.kind == "f":
+            out[np.isnan(values)] = ""
+        return out
+
+    if isinstance(values, np.ndarray) and values.dtype == object:
+        out = np.full(len(values), "", dtype=object)
+        missing = pd.isna(values)
+        listlike = np.fromiter(map(is_listlike, values), dtype=bool, count=len(values))
+        scalar = ~missing & ~listlike
+        out[scalar] = _text_array(values[scalar])
+        if np.any(listlike):
+            out[listlike] = _serialize_lists(values[listlike])
+        return out
+
+    if values.dtype.kind in "biufO" or isinstance(values.dtype, pd.StringDtype):
+        # Nullable extension types
+        missing = np.asarray(pd.isna(values), dtype=bool)
+        out = np.full(len(values), "", dtype=object)
+        out[~missing] = _text_array(np.asarray(values[~missing], dtype=object))
+        return out
+
+    return _object_array(
+        [stringify_list(x) if is_listlike(x) else blankify_nan(x) for x in col]
+    )
+
+
+def serialize_frame(df):
+    """Convert every column of a dataframe with `serialize_column`.
+
+    Returns
+    -------
+    np.ndarray
+        2d object array of strings with the same shape as the dataframe.
+    """
+    out = np.empty(df.shape, dtype=object)
+    for ii, col in enumerate(df.columns):
+        out[:, ii] = serialize_column(df.iloc[:, ii])
+    return out
+
+
 def process_column(col):
-    return [stringify_list(x) if is_listlike(x) else blankify_nan(x) for x in col]
+    return list(serialize_column(col))
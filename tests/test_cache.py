@@ -0,0 +1,95 @@
+import functools
+
+import pandas as pd
+import pytest
+
+from tablebridge import SheetCache, SheetProcessor
+from tablebridge.testing import FakeSheetsService
+from tablebridge.validation import process_int, with_dtype
+
+GRID = [["id", "value"], ["1", "a"], ["2", "b"]]
+
+
+def _processor(service, cache, **kwargs):
+    return SheetProcessor(
+        "sheet",
+        None,
+        ["id", "value"],
+        first_row=2,
+        sheet_name="Sheet1",
+        service=service,
+        cache=cache,
+        **kwargs,
+    )
+
+
+def _reads(service):
+    return [entry for entry in service.log if entry["kind"] == "read"]
+
+
+def test_key_depends_on_validators():
+    key = SheetCache.key("sheet", "A2:B", ["id"], {"id": process_int})
+
+    assert key == SheetCache.key("sheet", "A2:B", ["id"], {"id": process_int})
+    assert key != SheetCache.key("sheet", "A2:B", ["id"])
+    assert key != SheetCache.key(
+        "sheet", "A2:B", ["id"], {"id": with_dtype(process_int, "Int64")}
+    )
+
+
+@pytest.mark.parametrize(
+    "validator",
+    [
+        lambda x: x,
+        functools.partial(int, base=16),
+        with_dtype(lambda x: x, "Int64"),
+    ],
+)
+def test_key_rejects_validators_without_stable_name(validator):
+    with pytest.raises(ValueError):
+        SheetCache.key("sheet", "A2:B", ["id"], {"id": validator})
+
+
+def test_processor_with_lambda_needs_explicit_key(tmp_path):
+    cache = SheetCache(str(tmp_path))
+    validation_map = {"id": lambda x: int(x)}
+
+    with pytest.raises(ValueError):
+        _processor(FakeSheetsService(), cache, validation_map=validation_map)
+
+    processor = _processor(
+        FakeSheetsService(), cache, validation_map=validation_map, cache_key="ids"
+    )
+    assert processor.cache_key == "ids"
+
+
+def test_processor_reuses_cached_data(tmp_path):
+    service = FakeSheetsService()
+    service.set_grid("sheet", GRID, "Sheet1")
+    cache = SheetCache(str(tmp_path))
+
+    first = _processor(service, cache, validation_map={"id": process_int})
+    first.update_data()
+    second = _processor(service, cache, validation_map={"id": process_int})
+
+    pd.testing.assert_frame_equal(second.data, first.data)
+    assert len(_reads(service)) == 1
+
+
+def test_load_misses_stale_and_broken_entries(tmp_path):
+    cache = SheetCache(str(tmp_path), ttl=60)
+    df = pd.DataFrame({"a": [1, 2]})
+
+    cache.save("k", df, fetched_at=0)
+    assert cache.load("k") is None
+
+    cache.save("k", df)
+    loaded, meta = cache.load("k")
+    pd.testing.assert_frame_equal(loaded, df)
+
+    with open(cache._data_file("k", meta), "w") as f:
+        f.write("truncated")
+    assert cache.load("k") is None
+
+    cache.invalidate("k")
+    assert list(tmp_path.iterdir()) == []
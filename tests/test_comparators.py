@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+from tablebridge import AnnotationComparison, comparators
+
+
+def _differs(comparator, a, b):
+    return comparator(pd.Series(a, dtype=object), pd.Series(b, dtype=object)).tolist()
+
+
+def test_missing_values():
+    for comparator in [
+        comparators.exact,
+        comparators.numeric_tolerance(),
+        comparators.coerced_equality(),
+        comparators.normalized_text(),
+        comparators.unordered_list(),
+    ]:
+        assert _differs(comparator, [None, None, "a"], [np.nan, "a", None]) == [
+            False,
+            True,
+            True,
+        ]
+
+
+def test_numeric_tolerance():
+    differs = _differs(
+        comparators.numeric_tolerance(),
+        [0.1 + 0.2, 1, "2.0", 1.0, "x"],
+        ["0.3", 1.0, 2, 1.1, "x"],
+    )
+    assert differs == [False, False, False, True, False]
+
+
+def test_coerced_equality():
+    differs = _differs(
+        comparators.coerced_equality(),
+        [1, 1.0, " 01 ", "-0", 0.5, 2**64 - 1, 2**64 - 1, "abc", 1e20, 0.1 + 0.2],
+        [
+            "1",
+            "1",
+            "+1",
+            "0.0",
+            "0.50",
+            "18446744073709551615",
+            2**64 - 2,
+            "ABC",
+            "1e20",
+            "0.3",
+        ],
+    )
+    assert differs == [False, False, False, False, False, False, True, True, False, True]
+
+
+def test_coerced_equality_typed_columns():
+    comparator = comparators.coerced_equality()
+    ints = pd.Series([1, 2, 3], dtype=np.int64)
+    floats = pd.Series([1.0, 2.5, 3.0])
+    text = pd.Series(["1", "2.50", "4"], dtype=object)
+    assert comparator(ints, text).tolist() == [False, True, True]
+    assert comparator(floats, text).tolist() == [False, False, True]
+
+
+def test_text_comparators_accept_lists_and_long_cells():
+    long_text = "x" * 100_000
+    a = [[1, 2], long_text, "a"]
+    b = [[1, 2], long_text, "b"]
+    assert _differs(comparators.coerced_equality(), a, b) == [False, False, True]
+    assert _differs(comparators.normalized_text(), a, b) == [False, False, True]
+
+
+def test_normalized_text():
+    a = ["  Hello   World ", "abc", "a b"]
+    b = ["hello world", "ABC", "ab"]
+    assert _differs(comparators.normalized_text(), a, b) == [False, False, True]
+    assert _differs(comparators.normalized_text(case=True), a, b) == [True, True, True]
+    assert _differs(comparators.normalized_text(whitespace=True), a, b) == [
+        True,
+        False,
+        True,
+    ]
+
+
+def test_unordered_list():
+    differs = _differs(
+        comparators.unordered_list(),
+        [[1, 2, 3], [1, 1, 2], [], "x", [1], ("a", "b")],
+        [[3, 1, 2], [1, 2, 2], [], "x", 1, ["b", "a"]],
+    )
+    assert differs == [False, True, False, False, False, False]
+
+
+def test_annotation_comparison_uses_comparators():
+    new = pd.DataFrame(
+        {"id": [1, 2, 3], "value": [1, 2, 3], "tags": [["a", "b"], ["c"], []]}
+    )
+    old = pd.DataFrame(
+        {"id": [1, 2, 3], "value": ["1", "2.0", "4"], "tags": [["b", "a"], ["c"], []]}
+    )
+    comp = AnnotationComparison(
+        new,
+        old,
+        "id",
+        comparators={
+            "value": comparators.coerced_equality(),
+            "tags": comparators.unordered_list(),
+        },
+    )
+    assert comp.diff().changed_ids.tolist() == [3]
+    cells = comp.changed_cells()
+    assert cells[["id", "column"]].values.tolist() == [[3, "value"]]
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tablebridge import AnnotationComparison, partitioned_diff
+
+
+def _tables(n=40):
+    old = pd.DataFrame({"id": np.arange(n), "value": np.arange(n) * 10})
+    new = old.copy()
+    new.loc[5, "value"] = -1
+    return new, old
+
+
+def _summary(results):
+    totals = {"new": 0, "removed": 0, "changed": 0, "unchanged": 0}
+    for result in results:
+        for key, count in result.summary().items():
+            totals[key] += count
+    return totals
+
+
+@pytest.mark.parametrize("id_dtype", [np.int64, np.float64, object])
+def test_partitioned_diff_with_mixed_id_dtypes(id_dtype):
+    new, old = _tables()
+    new["id"] = new["id"].astype(id_dtype)
+    expected = AnnotationComparison(new, old, "id").diff().summary()
+    assert expected == {"new": 0, "removed": 0, "changed": 1, "unchanged": 39}
+    assert _summary(partitioned_diff(new, old, "id", n_partitions=7)) == expected
+
+
+def test_partitioned_diff_with_chunks():
+    new, old = _tables()
+    old["id"] = old["id"].astype(float)
+    chunks = [new.iloc[:15], new.iloc[15:]]
+    results = partitioned_diff(iter(chunks), old, "id", n_partitions=4)
+    assert _summary(results) == AnnotationComparison(new, old, "id").diff().summary()
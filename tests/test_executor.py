@@ -0,0 +1,141 @@
+import httplib2
+import pytest
+
+from tablebridge import ExecutionReport, RequestExecutor
+from tablebridge.auth import HttpError
+from tablebridge.executor import split_append, split_batch_update
+from tablebridge.testing import FakeSheetsService
+
+
+def _executor(**kwargs):
+    settings = dict(
+        read_per_minute=None,
+        write_per_minute=None,
+        project_read_per_minute=None,
+        project_write_per_minute=None,
+        base_delay=0,
+    )
+    settings.update(kwargs)
+    return RequestExecutor(**settings)
+
+
+def _error(status):
+    return HttpError(httplib2.Response({"status": status}), b"{}", uri="test://")
+
+
+class _Request:
+    "Request that fails with the given statuses, then succeeds"
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def execute(self):
+        self.calls += 1
+        if self.statuses:
+            raise _error(self.statuses.pop(0))
+        return {"ok": True}
+
+
+def test_retry_delay():
+    executor = _executor(max_retries=3, base_delay=1, max_delay=4)
+    for status in [429, 500, 503]:
+        assert 0 <= executor.retry_delay(0, status) <= 1
+    assert 0 <= executor.retry_delay(2, 429) <= 4
+    assert executor.retry_delay(0, 400) is None
+    assert executor.retry_delay(0, 404) is None
+    assert executor.retry_delay(3, 429) is None
+    assert executor.retry_delay(0, 429, retry_after=10) >= 10
+    # Without a response the request may have been applied
+    assert executor.retry_delay(0, None, idempotent=True) is not None
+    assert executor.retry_delay(0, None, idempotent=False) is None
+
+
+def test_backoff_grows_up_to_max_delay():
+    executor = _executor(base_delay=1, max_delay=8)
+    for attempt in range(10):
+        delays = [executor.backoff(attempt) for _ in range(50)]
+        assert max(delays) <= min(8, 2**attempt)
+
+
+def test_execute_retries_until_success():
+    executor = _executor(max_retries=3)
+    request = _Request([429, 503])
+    report = ExecutionReport()
+    assert executor.execute(lambda: request, report=report) == {"ok": True}
+    assert request.calls == 3
+    assert report.retries == 2
+    assert report.ok
+
+
+def test_execute_gives_up():
+    executor = _executor(max_retries=2)
+    request = _Request([503] * 5)
+    with pytest.raises(HttpError):
+        executor.execute(lambda: request)
+    assert request.calls == 3
+
+    request = _Request([400])
+    report = ExecutionReport()
+    assert executor.execute(lambda: request, report=report) is None
+    assert request.calls == 1
+    assert not report.ok
+
+
+def test_execute_against_quota_limited_service():
+    service = FakeSheetsService(read_quota_per_minute=1)
+    service.set_grid("sheet", [["a"]])
+    executor = _executor(max_retries=2)
+    values = service.spreadsheets().values()
+
+    assert executor.execute(lambda: values.get(spreadsheetId="sheet", range="A1:A"))
+    with pytest.raises(HttpError):
+        executor.execute(lambda: values.get(spreadsheetId="sheet", range="A1:A"))
+    assert [entry["status"] for entry in service.log] == [200, 429, 429, 429]
+
+
+def test_execute_chunks():
+    executor = _executor(max_retries=0)
+    requests = {1: _Request([]), 2: _Request([400]), 3: _Request([])}
+
+    report = executor.execute_chunks(lambda body: requests[body], [1, 2, 3])
+    assert len(report.responses) == 2
+    assert [body for body, _ in report.failures] == [2]
+    assert report.unsent == []
+
+    requests[2] = _Request([400])
+    report = executor.execute_chunks(lambda body: requests[body], [1, 2, 3], ordered=True)
+    assert len(report.responses) == 1
+    assert [body for body, _ in report.failures] == [2]
+    assert report.unsent == [3]
+    assert not report.ok
+
+
+def test_split_batch_update():
+    body = {
+        "valueInputOption": "USER_ENTERED",
+        "data": [
+            {"range": "Sheet1!A1:A1", "values": [["x"]]},
+            {"range": "Sheet1!B2:C6", "values": [[r, r] for r in range(5)]},
+        ],
+    }
+    bodies = split_batch_update(body, max_cells=4)
+    assert all(b["valueInputOption"] == "USER_ENTERED" for b in bodies)
+    assert all(sum(len(r) for e in b["data"] for r in e["values"]) <= 4 for b in bodies)
+    entries = [e for b in bodies for e in b["data"]]
+    assert [e["range"] for e in entries] == [
+        "Sheet1!A1:A1",
+        "Sheet1!B2:C3",
+        "Sheet1!B4:C5",
+        "Sheet1!B6:C6",
+    ]
+    assert [r for e in entries[1:] for r in e["values"]] == [[r, r] for r in range(5)]
+    assert split_batch_update(body) == [body]
+
+
+def test_split_append_keeps_row_order():
+    body = {"values": [[str(r), "x" * 10] for r in range(10)]}
+    bodies = split_append(body, max_cells=6, max_bytes=60)
+    assert [row for b in bodies for row in b["values"]] == body["values"]
+    assert all(len(b["values"]) * 2 <= 6 for b in bodies)
+    assert split_append({"values": []}) == [{"values": []}]
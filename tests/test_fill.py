@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from tablebridge import fill_column_from_above
+
+
+def test_fills_from_above():
+    df = pd.DataFrame({"a": [np.nan, 1.0, np.nan, np.nan, 2.0, np.nan]})
+    out = fill_column_from_above(df, "a", starting_value=-1)
+    assert out["a"].tolist() == [-1, 1, 1, 1, 2, 2]
+    assert df["a"].isna().sum() == 4
+
+
+def test_falsy_starting_value_is_ignored():
+    df = pd.DataFrame({"a": [None, "x", None]}, dtype=object)
+    for start in [None, 0, ""]:
+        out = fill_column_from_above(df, "a", starting_value=start)
+        assert out["a"].isna().tolist() == [True, False, False]
+        assert out["a"].tolist()[1:] == ["x", "x"]
+
+
+def test_list_cells_with_na_count_as_missing():
+    cells = [["a", "b"], ["x", np.nan], [np.nan], [], [1, None], [[1, np.nan]], ["c"]]
+    df = pd.DataFrame({"a": pd.Series(cells, dtype=object)})
+    out = fill_column_from_above(df, "a")
+    assert out["a"].tolist() == [
+        ["a", "b"],
+        ["a", "b"],
+        ["a", "b"],
+        [],
+        [],
+        [],
+        ["c"],
+    ]
+
+
+def test_groupby_and_limit():
+    df = pd.DataFrame(
+        {"g": [1, 1, 1, 2, 2, 2], "a": [5.0, np.nan, np.nan, np.nan, 7.0, np.nan]}
+    )
+    out = fill_column_from_above(df, "a", groupby="g", limit=1)
+    assert out["a"].tolist()[:2] == [5, 5]
+    assert out["a"].isna().tolist() == [False, False, True, True, False, False]
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tablebridge import RowFingerprints
+from tablebridge.fingerprint import hash_rows
+
+
+def _table():
+    return pd.DataFrame(
+        {
+            "id": [10, 11, 12],
+            "count": [1, 2, 3],
+            "name": ["a", "b", "c"],
+            "point": [[1, 2, 3], [4, 5, 6], [7, 8, 9]],
+        }
+    )
+
+
+def test_hashes_are_pinned():
+    # Saved fingerprints are compared across runs and releases, so hashes must not drift
+    # without a new HASH_VERSION
+    df = pd.DataFrame({"a": [1, 2], "b": ["x", None], "c": [[1, 2, 3], 1.5]})
+    assert hash_rows(df, ["a", "b", "c"]).tolist() == [
+        9309018706703009575,
+        10601566231265421460,
+    ]
+
+
+def test_hashes_do_not_depend_on_dtype():
+    df = _table()
+    expected = hash_rows(df, ["count", "name", "point"])
+    variants = [
+        df.astype({"count": float}),
+        df.astype({"count": object}),
+        df.astype({"count": "Int64", "name": "string"}),
+        df.assign(point=df["point"].map(tuple)),
+    ]
+    for variant in variants:
+        assert hash_rows(variant, ["count", "name", "point"]).tolist() == expected.tolist()
+
+
+def test_hashes_tell_values_apart():
+    df = pd.DataFrame({"a": [1, "1", [1], None, 1.5, 2**64 - 1]}, dtype=object)
+    hashes = hash_rows(df, ["a"])
+    assert len(set(hashes.tolist())) == len(df)
+
+
+def test_missing_values_hash_alike():
+    df = pd.DataFrame({"a": [None, np.nan, pd.NA]}, dtype=object)
+    assert len(set(hash_rows(df, ["a"]).tolist())) == 1
+
+
+def test_compare():
+    old = _table()
+    new = old.copy()
+    new.loc[1, "name"] = "changed"
+    added = pd.DataFrame({"id": [13], "count": [4], "name": ["d"], "point": [None]})
+    new = pd.concat([new.iloc[1:], added])
+
+    result = RowFingerprints.from_dataframe(new, "id").compare(
+        RowFingerprints.from_dataframe(old, "id")
+    )
+    assert result.summary() == {"new": 1, "removed": 1, "changed": 1, "unchanged": 1}
+    assert result.new_ids.tolist() == [13]
+    assert result.removed_ids.tolist() == [10]
+    assert result.changed_ids.tolist() == [11]
+
+
+@pytest.mark.parametrize(
+    "ids, dtype",
+    [([10, 11, 12], np.int64), (["a", "b", "c"], object), ([1, "b", 3.5], object)],
+)
+def test_save_and_load(tmp_path, ids, dtype):
+    df = _table().assign(id=pd.Series(ids, dtype=dtype))
+    fingerprints = RowFingerprints.from_dataframe(df, "id")
+    fingerprints.save(tmp_path / "snapshot.npz")
+    loaded = RowFingerprints.load(tmp_path / "snapshot.npz")
+
+    assert loaded.ids.tolist() == ids
+    assert loaded.hashes.tolist() == fingerprints.hashes.tolist()
+    assert loaded.data_columns == fingerprints.data_columns
+    assert fingerprints.compare(loaded).summary()["unchanged"] == 3
+
+
+def test_compare_rejects_other_hash_versions():
+    df = _table()
+    fingerprints = RowFingerprints.from_dataframe(df, "id")
+    old = RowFingerprints(
+        fingerprints.ids,
+        fingerprints.hashes,
+        "id",
+        fingerprints.data_columns,
+        hash_version=1,
+    )
+    with pytest.raises(ValueError):
+        fingerprints.compare(old)
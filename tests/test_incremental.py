@@ -0,0 +1,148 @@
+import asyncio
+
+import pandas as pd
+
+from tablebridge import (
+    AsyncSheetProcessor,
+    AsyncSheetsClient,
+    RequestExecutor,
+    SheetProcessor,
+)
+from tablebridge.testing import FakeSheetsServer, FakeSheetsService
+
+
+def _executor():
+    return RequestExecutor(
+        read_per_minute=None,
+        write_per_minute=None,
+        project_read_per_minute=None,
+        project_write_per_minute=None,
+        max_retries=0,
+        base_delay=0,
+    )
+
+
+def _grid(n_rows):
+    return [["id", "value"]] + [[str(ii), f"v{ii}"] for ii in range(n_rows)]
+
+
+def _record_reads(service, monkeypatch):
+    ranges = []
+    get = service.get
+
+    def recording_get(spreadsheetId, range, **kwargs):
+        ranges.append(range)
+        return get(spreadsheetId, range, **kwargs)
+
+    monkeypatch.setattr(service, "get", recording_get)
+    return ranges
+
+
+def _processor(service):
+    return SheetProcessor(
+        "sheet",
+        None,
+        ["id", "value"],
+        first_row=2,
+        sheet_name="Sheet1",
+        service=service,
+        executor=_executor(),
+    )
+
+
+def test_incremental_read_fetches_new_rows(monkeypatch):
+    service = FakeSheetsService()
+    service.set_grid("sheet", _grid(30))
+    processor = _processor(service)
+    processor.update_data()
+    ranges = _record_reads(service, monkeypatch)
+
+    service.set_grid("sheet", _grid(33))
+    data = processor.update_data(incremental=True, overlap=3)
+
+    assert ranges == ["Sheet1!A29:B"]
+    assert data.index.tolist() == list(range(2, 35))
+    assert data["value"].tolist() == [f"v{ii}" for ii in range(33)]
+
+
+def test_incremental_read_reloads_when_overlap_changed(monkeypatch):
+    service = FakeSheetsService()
+    service.set_grid("sheet", _grid(30))
+    processor = _processor(service)
+    processor.update_data()
+    ranges = _record_reads(service, monkeypatch)
+
+    grid = _grid(31)
+    grid[30][1] = "edited"
+    service.set_grid("sheet", grid)
+    data = processor.update_data(incremental=True, overlap=3)
+
+    assert ranges == ["Sheet1!A29:B", "Sheet1!A2:B"]
+    assert data.loc[31, "value"] == "edited"
+    assert len(data) == 31
+
+
+def test_incremental_read_after_own_write_is_full(monkeypatch):
+    service = FakeSheetsService()
+    service.set_grid("sheet", _grid(30))
+    processor = _processor(service)
+    processor.update_data()
+
+    report = processor.set_value_series(
+        pd.Series(["new2", "new3"], index=[3, 4], name="value")
+    )
+    assert report.ok
+    ranges = _record_reads(service, monkeypatch)
+    data = processor.update_data(incremental=True)
+
+    assert ranges == ["Sheet1!A2:B"]
+    assert data.loc[[3, 4], "value"].tolist() == ["new2", "new3"]
+
+
+def test_incremental_read_checks_all_rows_of_short_sheet(monkeypatch):
+    service = FakeSheetsService()
+    service.set_grid("sheet", _grid(4))
+    processor = _processor(service)
+    processor.update_data(overlap=5)
+    ranges = _record_reads(service, monkeypatch)
+
+    grid = _grid(5)
+    grid[1][1] = "edited"
+    service.set_grid("sheet", grid)
+    data = processor.update_data(incremental=True, overlap=5)
+
+    assert ranges == ["Sheet1!A2:B", "Sheet1!A2:B"]
+    assert data["value"].tolist() == ["edited", "v1", "v2", "v3", "v4"]
+
+
+def test_async_incremental_read_against_server():
+    async def run(server):
+        async with AsyncSheetsClient(base_url=server.url, executor=_executor()) as client:
+            processor = AsyncSheetProcessor(
+                "sheet",
+                None,
+                ["id", "value"],
+                first_row=2,
+                sheet_name="Sheet1",
+                client=client,
+            )
+            await processor.update_data()
+
+            server.service.set_grid("sheet", _grid(32))
+            appended = await processor.update_data(incremental=True)
+
+            await processor.set_value_series(
+                pd.Series(["new2"], index=[3], name="value")
+            )
+            after_write = await processor.update_data(incremental=True)
+            return appended, after_write
+
+    with FakeSheetsServer() as server:
+        server.service.set_grid("sheet", _grid(30))
+        appended, after_write = asyncio.run(run(server))
+        log = [entry["method"] for entry in server.service.log]
+
+    assert appended["id"].tolist() == [str(ii) for ii in range(32)]
+    assert after_write.loc[3, "value"] == "new2"
+    assert after_write.loc[4, "value"] == "v2"
+    assert log == ["get", "get", "batchUpdate", "get"]
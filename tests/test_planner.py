@@ -0,0 +1,72 @@
+from tablebridge.planner import plan_updates
+from tablebridge.processing import _package_batch_update
+
+
+def _ranges(data):
+    return {entry["range"]: entry["values"] for entry in data}
+
+
+def test_single_cells():
+    data = plan_updates([2, 5], ["A", "C"], ["x", "y"], sheet_name="Sheet1")
+    assert _ranges(data) == {"Sheet1!A2:A2": [["x"]], "Sheet1!C5:C5": [["y"]]}
+
+
+def test_column_run():
+    data = plan_updates([4, 2, 3], ["B", "B", "B"], [3, 1, 2])
+    assert _ranges(data) == {"B2:B4": [[1], [2], [3]]}
+
+
+def test_row_span():
+    data = plan_updates([7, 7, 7], ["C", "A", "B"], [3, 1, 2])
+    assert _ranges(data) == {"A7:C7": [[1, 2, 3]]}
+
+
+def test_dense_block():
+    rows = [10, 10, 11, 11, 12, 12]
+    columns = ["Y", "Z", "Y", "Z", "Y", "Z"]
+    data = plan_updates(rows, columns, range(6), sheet_name="Sheet1")
+    assert _ranges(data) == {"Sheet1!Y10:Z12": [[0, 1], [2, 3], [4, 5]]}
+
+
+def test_mixed_shapes():
+    rows = [2, 3, 4, 2, 2, 10, 11, 10, 11]
+    columns = ["A", "A", "A", "B", "C", "E", "E", "F", "F"]
+    data = plan_updates(rows, columns, range(9))
+    assert _ranges(data) == {
+        "A2:A4": [[0], [1], [2]],
+        "B2:C2": [[3, 4]],
+        "E10:F11": [[5, 7], [6, 8]],
+    }
+
+
+def test_gaps_are_only_spanned_when_allowed():
+    rows, columns = [20, 22, 20], ["A", "A", "C"]
+    assert _ranges(plan_updates(rows, columns, [1, 2, 3])) == {
+        "A20:A20": [[1]],
+        "A22:A22": [[2]],
+        "C20:C20": [[3]],
+    }
+    # Spanned cells are sent as null, which leaves them unchanged
+    assert _ranges(plan_updates(rows, columns, [1, 2, 3], max_gap=1)) == {
+        "A20:A22": [[1], [None], [2]],
+        "C20:C20": [[3]],
+    }
+
+
+def test_last_value_of_repeated_cell_wins():
+    data = plan_updates([5, 5, 6], ["AA", "AA", "AA"], ["old", "new", "next"])
+    assert _ranges(data) == {"AA5:AA6": [["new"], ["next"]]}
+
+
+def test_every_cell_is_written_once():
+    rows = [r for r in range(2, 40) for _ in range(3)]
+    columns = ["A", "C", "D"] * 38
+    values = list(range(len(rows)))
+    body = _package_batch_update(rows, columns, values, "Sheet1", max_gap=2)
+    written = [v for entry in body["data"] for row in entry["values"] for v in row]
+    assert sorted(v for v in written if v is not None) == values
+    assert body["valueInputOption"] == "USER_ENTERED"
+
+
+def test_empty():
+    assert plan_updates([], [], []) == []
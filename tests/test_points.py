@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from tablebridge import PointArray, PointDtype, parse_points
+from tablebridge.validation import (
+    column_validator,
+    process_point,
+    process_point_column,
+    with_dtype,
+)
+
+
+def test_construct_from_lists():
+    points = PointArray([[1, 2, 3], [4, 5, 6]])
+    assert points.coords.dtype == np.int64
+    assert list(points) == [[1, 2, 3], [4, 5, 6]]
+    assert not points.isna().any()
+
+
+def test_construct_casts_and_copies():
+    coords = np.array([[1.0, 2.0, 3.0]])
+    points = PointArray(coords, mask=[0])
+    assert points.coords.dtype == np.int64
+    assert points.isna().dtype == bool
+
+    ints = np.array([[1, 2, 3]], dtype=np.int64)
+    assert np.shares_memory(PointArray(ints).coords, ints)
+    copied = PointArray(ints, copy=True)
+    copied[0] = [7, 8, 9]
+    assert ints.tolist() == [[1, 2, 3]]
+
+
+def test_setitem():
+    s = pd.Series(parse_points(["1, 2, 3", "4 5 6", ""]))
+    s[0] = [7, 7, 7]
+    s[1] = None
+    s[2] = [8, 8, 8]
+    assert s[0] == [7, 7, 7]
+    assert s[1] is pd.NA
+    assert s[2] == [8, 8, 8]
+
+
+def test_take_and_reindex():
+    points = parse_points(["1,2,3", "4,5,6"])
+    taken = points.take([1, -1], allow_fill=True)
+    assert taken[0] == [4, 5, 6]
+    assert taken[1] is pd.NA
+
+    s = pd.Series(points, index=["a", "b"])
+    reindexed = s.reindex(["b", "c", "a"])
+    assert isinstance(reindexed.dtype, PointDtype)
+    assert reindexed.tolist() == [[4, 5, 6], pd.NA, [1, 2, 3]]
+
+    empty = PointArray(np.zeros((0, 3))).take([-1, -1], allow_fill=True)
+    assert empty.isna().tolist() == [True, True]
+
+
+def test_concat():
+    a = pd.Series(parse_points(["1,2,3", None]))
+    b = pd.Series(parse_points(["4,5,6"]))
+    combined = pd.concat([a, b], ignore_index=True)
+    assert isinstance(combined.dtype, PointDtype)
+    assert combined.tolist() == [[1, 2, 3], pd.NA, [4, 5, 6]]
+
+
+def test_process_point_keeps_object_lists():
+    col = np.array(["1, 2, 3", "", "no point", None], dtype=object)
+    expected = [[1, 2, 3], pd.NA, pd.NA, pd.NA]
+
+    assert column_validator(process_point) is process_point_column
+    out = column_validator(process_point)(col)
+    assert out.dtype == object
+    assert list(out) == expected
+
+    points = column_validator(with_dtype(process_point, "point"))(col)
+    assert isinstance(points, PointArray)
+    assert list(points) == expected
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from tablebridge import parse_points
+from tablebridge.processing import _package_append_data
+from tablebridge.validation import (
+    blankify_nan,
+    is_listlike,
+    serialize_column,
+    serialize_frame,
+    stringify_list,
+)
+
+
+def _reference(values):
+    return [stringify_list(x) if is_listlike(x) else blankify_nan(x) for x in values]
+
+
+def test_object_column_matches_per_cell_serialization():
+    values = [1, "text", [1, 2, 3], [4, 5, 6], None, np.nan, [1, "x"], ["1", "2"], 2.5]
+    assert list(serialize_column(pd.Series(values, dtype=object))) == _reference(values)
+
+
+def test_typed_columns():
+    assert list(serialize_column(pd.Series([1.5, np.nan, 3.0]))) == ["1.5", "", "3.0"]
+    assert list(serialize_column(pd.Series([1, None], dtype="Int64"))) == ["1", ""]
+    assert list(serialize_column(pd.Series(["a", None], dtype="string"))) == ["a", ""]
+    assert list(serialize_column(pd.Series(parse_points(["1,2,3", ""])))) == [
+        "1, 2, 3",
+        "",
+    ]
+
+
+def test_long_cells_stay_object_strings():
+    long_text = "x" * 5000
+    out = serialize_column(pd.Series([long_text, "a", [1, 2]], dtype=object))
+    assert out.dtype == object
+    assert list(out) == [long_text, "a", "1, 2"]
+
+
+def test_package_append_data():
+    df = pd.DataFrame({"a": [1, 2], "b": ["x" * 5000, None]})
+    body = _package_append_data(serialize_frame(df), add_blank_rows=True)
+    assert body["values"] == [
+        ["---", "---"],
+        ["1", "x" * 5000],
+        ["---", "---"],
+        ["2", ""],
+    ]
+    assert _package_append_data(serialize_frame(df.iloc[:0]), True) == {"values": []}
@@ -0,0 +1,94 @@
+import pandas as pd
+import pytest
+
+from tablebridge import SheetProcessor, RequestExecutor, plan_sync, sync_sheet
+from tablebridge.auth import HttpError
+from tablebridge.testing import FakeSheetsService
+
+GRID = [["id", "value"], ["1", "a"], ["2", "b"]]
+
+
+def _processor(service):
+    executor = RequestExecutor(
+        read_per_minute=None,
+        write_per_minute=None,
+        project_read_per_minute=None,
+        project_write_per_minute=None,
+        max_retries=2,
+        base_delay=0,
+    )
+    return SheetProcessor(
+        "sheet",
+        None,
+        ["id", "value"],
+        first_row=2,
+        sheet_name="Sheet1",
+        service=service,
+        executor=executor,
+    )
+
+
+def _writes(service):
+    return [entry["method"] for entry in service.log if entry["kind"] == "write"]
+
+
+def test_sync_writes_changed_cells_and_new_rows():
+    service = FakeSheetsService()
+    service.set_grid("sheet", GRID, "Sheet1")
+    df = pd.DataFrame({"id": ["1", "2", "3"], "value": ["a", "B", "c"]})
+
+    plan = sync_sheet(df, None, _processor(service), "id")
+
+    assert plan.summary() == {
+        "appended_rows": 1,
+        "updated_cells": 1,
+        "removed": 0,
+        "requests": 2,
+    }
+    assert all(report.ok for report in plan.reports.values())
+    assert _writes(service) == ["batchUpdate", "append"]
+    assert service.grid("sheet", "Sheet1") == GRID[:2] + [["2", "B"], ["3", "c"]]
+
+
+def test_sync_aborts_when_refresh_fails():
+    # The first read uses up the quota, so the refresh fails with status 429
+    service = FakeSheetsService(read_quota_per_minute=1)
+    service.set_grid("sheet", GRID, "Sheet1")
+    processor = _processor(service)
+    processor.update_data()
+    df = pd.DataFrame({"id": ["1", "2"], "value": ["a", "b"]})
+
+    with pytest.raises(HttpError):
+        plan_sync(df, None, processor, "id")
+    with pytest.raises(HttpError):
+        sync_sheet(df, None, processor, "id")
+
+    assert _writes(service) == []
+    assert service.grid("sheet", "Sheet1") == GRID
+    assert len(processor.data) == 2
+
+
+def test_sync_aborts_when_first_read_fails():
+    service = FakeSheetsService(read_quota_per_minute=0)
+    service.set_grid("sheet", GRID, "Sheet1")
+    df = pd.DataFrame({"id": ["1", "2", "3"], "value": ["a", "b", "c"]})
+
+    with pytest.raises(HttpError):
+        sync_sheet(df, None, _processor(service), "id", dry_run=True)
+    assert _writes(service) == []
+
+
+def test_sync_stops_before_appends_when_updates_fail():
+    # Requests with more than one cell are rejected with status 400, which is not retried
+    service = FakeSheetsService(max_request_cells=1)
+    service.set_grid("sheet", GRID, "Sheet1")
+    df = pd.DataFrame({"id": ["1", "2", "3"], "value": ["A", "B", "c"]})
+    plan = plan_sync(df, None, _processor(service), "id")
+
+    with pytest.raises(HttpError):
+        plan.execute()
+
+    assert not plan.reports["update"].ok
+    assert plan.reports["append"] is None
+    assert _writes(service) == ["batchUpdate"]
+    assert service.grid("sheet", "Sheet1") == GRID